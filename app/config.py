@@ -1,8 +1,18 @@
-from pydantic_settings import BaseSettings
+import msgspec
+from dotenv import load_dotenv
+from functools import lru_cache
 from typing import List, Optional
 import os
 
-class Settings(BaseSettings):
+def _parse_list(value: str) -> List[str]:
+    """Accept either a JSON list or a comma-separated string of values."""
+    if value.lstrip().startswith("["):
+        items = msgspec.json.decode(value, type=List[str])
+    else:
+        items = value.split(",")
+    return [item.strip() for item in items if item.strip()]
+
+class Settings(msgspec.Struct, frozen=True):
     # API Configuration
     API_V1_STR: str = "/api/v1"
     PROJECT_NAME: str = "Relationship Calculator API"
@@ -15,7 +25,12 @@ class Settings(BaseSettings):
     API_BASE_URL: str = "http://localhost:8000"
     
     # CORS Configuration
-    CORS_ORIGINS: List[str] = ["http://localhost:3000", "http://localhost:8000"]
+    CORS_ORIGINS: List[str] = msgspec.field(
+        default_factory=lambda: ["http://localhost:3000", "http://localhost:8000"]
+    )
+    
+    # Trusted Hosts ("*" disables host checking)
+    ALLOWED_HOSTS: List[str] = msgspec.field(default_factory=lambda: ["*"])
     
     # Database Configuration
     DATABASE_URL: str = "sqlite:///./sql_app.db"
@@ -27,6 +42,7 @@ class Settings(BaseSettings):
     
     # Rate Limiting
     RATE_LIMIT_PER_MINUTE: int = 60
+    REDIS_URL: Optional[str] = None
     
     # Data Files
     RELATIONSHIPS_FILE: str = "data/relationships.json"
@@ -44,14 +60,16 @@ class Settings(BaseSettings):
     OPENROUTER_API_KEY: str = ""
     MODEL_NAME: Optional[str] = None
     
-    class Config:
-        env_file = ".env"
-        case_sensitive = True
-        extra = "allow"  # Permitir campos extra
+    @classmethod
+    @lru_cache(maxsize=1)
+    def _load(cls) -> "Settings":
+        """Build the settings once from the environment and the .env file."""
+        load_dotenv()
+        values = {name: os.environ[name] for name in cls.__struct_fields__ if name in os.environ}
+        for name in ("CORS_ORIGINS", "ALLOWED_HOSTS"):
+            if name in values:
+                values[name] = _parse_list(values[name])
+        return msgspec.convert(values, cls, strict=False)
 
 # Create settings instance
-settings = Settings()
-
-# Get CORS origins as list
-def get_cors_origins() -> List[str]:
-    return settings.CORS_ORIGINS 
\ No newline at end of file
+settings = Settings._load()
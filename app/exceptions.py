@@ -1,6 +1,5 @@
 from fastapi import HTTPException, status
 from typing import Any, Dict
-from app.logger import logger
 
 class APIException(HTTPException):
     """Base exception for API errors."""
@@ -13,12 +12,6 @@ class APIException(HTTPException):
     ):
         super().__init__(status_code=status_code, detail=detail, headers=headers)
         self.error_code = error_code
-        logger.error(
-            "API Error",
-            status_code=status_code,
-            detail=detail,
-            error_code=error_code
-        )
 
 class ValidationError(APIException):
     """Exception for validation errors."""
@@ -45,4 +38,4 @@ class RateLimitError(APIException):
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
             detail=detail,
             error_code="RATE_LIMIT_EXCEEDED"
-        ) 
\ No newline at end of file
+        )
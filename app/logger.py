@@ -1,29 +1,122 @@
 import structlog
+import atexit
+import functools
 import logging
-from typing import Any, Dict
+import orjson
+import os
+import queue
+import sys
+import threading
+from typing import Any, Callable, Dict, List, Optional
 from app.config import settings
 
+# Numeric log level, also used to skip building log fields that would be filtered out
+LOG_LEVEL: int = logging.getLevelName(settings.LOG_LEVEL)
+
+# Events waiting for the writer thread; new events are dropped when it is full
+LOG_QUEUE_SIZE = 10_000
+# Maximum number of events encoded and written per os.write
+LOG_BATCH_SIZE = 64
+
+class QueueLogger:
+    """structlog logger that hands event dicts to the background log writer."""
+
+    def __init__(self, log_queue: "queue.Queue[Optional[Dict[str, Any]]]"):
+        self._queue = log_queue
+
+    def msg(self, **event_dict: Any) -> None:
+        if log_writer is None:
+            start_log_writer()
+        try:
+            self._queue.put_nowait(event_dict)
+        except queue.Full:
+            # Drop the event rather than block the request path
+            pass
+
+    log = debug = info = warn = warning = msg
+    fatal = failure = err = error = critical = exception = msg
+
+def _write_all(fd: int, data: bytes) -> None:
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+def _write_stdout(data: bytes) -> None:
+    sys.stdout.write(data.decode())
+    sys.stdout.flush()
+
+def _stdout_writer() -> Callable[[bytes], None]:
+    """Return a function writing bytes to stdout, straight to its fd when it has one."""
+    try:
+        fd = sys.stdout.fileno()
+    except (AttributeError, OSError, ValueError):
+        # Replaced streams (pytest capture, StringIO) have no usable file descriptor
+        return _write_stdout
+    return functools.partial(_write_all, fd)
+
+def _write_logs(log_queue: "queue.Queue[Optional[Dict[str, Any]]]", write: Callable[[bytes], None]) -> None:
+    """Drain the queue, encoding and writing events in batches."""
+    while True:
+        batch: List[Optional[Dict[str, Any]]] = [log_queue.get()]
+        while len(batch) < LOG_BATCH_SIZE:
+            try:
+                batch.append(log_queue.get_nowait())
+            except queue.Empty:
+                break
+        events = [event for event in batch if event is not None]
+        if events:
+            write(b"".join(orjson.dumps(event, default=str) + b"\n" for event in events))
+        if len(events) != len(batch):
+            # A None sentinel asks the writer to stop
+            return
+
+log_queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+# Started on first use (or from the app's startup event) so importing this module,
+# e.g. in a gunicorn master before forking, does not spawn a thread
+log_writer: Optional[threading.Thread] = None
+_log_writer_lock = threading.Lock()
+
+def start_log_writer() -> None:
+    """Start the background log writer if it is not running yet."""
+    global log_writer
+    with _log_writer_lock:
+        if log_writer is not None:
+            return
+        log_writer = threading.Thread(
+            target=_write_logs, args=(log_queue, _stdout_writer()), name="log-writer", daemon=True
+        )
+        log_writer.start()
+
+@atexit.register
+def _stop_log_writer() -> None:
+    if log_writer is None:
+        return
+    log_queue.put(None)
+    log_writer.join(timeout=1.0)
+
 def configure_logging() -> None:
     """Configure structured logging for the application."""
+    # Rendering to JSON happens on the writer thread, so the processor chain
+    # ends with the event dict itself
     structlog.configure(
         processors=[
             structlog.processors.add_log_level,
             structlog.processors.TimeStamper(fmt="iso"),
-            structlog.processors.JSONRenderer(),
         ],
-        wrapper_class=structlog.BoundLogger,
+        wrapper_class=structlog.make_filtering_bound_logger(LOG_LEVEL),
         context_class=dict,
-        logger_factory=structlog.PrintLoggerFactory(),
+        logger_factory=lambda *args: QueueLogger(log_queue),
         cache_logger_on_first_use=True,
     )
 
-    # Set logging level
-    logging.getLogger().setLevel(settings.LOG_LEVEL)
+def is_enabled_for(level: int) -> bool:
+    """Return whether events at the given level are emitted."""
+    return level >= LOG_LEVEL
 
-def get_logger(name: str) -> structlog.BoundLogger:
+def get_logger(name: str) -> structlog.typing.FilteringBoundLogger:
     """Get a structured logger instance."""
     return structlog.get_logger(name)
 
 # Initialize logging
 configure_logging()
-logger = get_logger("app") 
\ No newline at end of file
+logger = get_logger("app")
\ No newline at end of file
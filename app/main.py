@@ -1,38 +1,61 @@
-from fastapi import FastAPI, Depends, HTTPException, Request
-from sqlalchemy.orm import Session
-from typing import List, Optional, Callable, Dict, Any
+from fastapi import FastAPI, HTTPException, Request
+from sqlalchemy.orm import Session, selectinload
+from typing import List, NamedTuple, Optional, Dict, Any, Tuple
 from . import models, database
-from .database import get_db
 from pydantic import BaseModel, Field
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from fastapi.openapi.docs import get_swagger_ui_html
+from fastapi.responses import ORJSONResponse, Response
+from fastapi.openapi.docs import get_redoc_html, get_swagger_ui_html
 from fastapi.openapi.utils import get_openapi
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from starlette.middleware.sessions import SessionMiddleware
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+import random
 import time
+import logging
+import msgspec
+import numpy as np
 from app.config import settings
-from app.logger import logger
+from app.logger import logger, is_enabled_for, start_log_writer
 from app.exceptions import APIException, RateLimitError
 from app.routers import relationships, dna_analysis
 from fastapi.middleware.gzip import GZipMiddleware
 import os
 import json
 from pathlib import Path
+from bisect import bisect_left
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
     description=settings.DESCRIPTION,
-    docs_url="/docs",
-    redoc_url="/redoc"
+    default_response_class=ORJSONResponse,
+    # The docs and schema routes below serve cached bodies instead
+    docs_url=None,
+    redoc_url=None,
+    openapi_url=None
 )
 
+def create_limiter(storage_uri: Optional[str]) -> Limiter:
+    """Build the per-IP limiter used by the @limiter.limit routes.
+
+    Counters live in Redis when storage_uri is set, so all workers share one quota;
+    if Redis is unreachable the limiter falls back to per-process memory (fail open).
+    Limited responses carry Retry-After and X-RateLimit-* headers.
+    """
+    return Limiter(
+        key_func=get_remote_address,
+        storage_uri=storage_uri or "memory://",
+        in_memory_fallback_enabled=storage_uri is not None,
+        swallow_errors=True,
+        headers_enabled=True,
+        key_prefix="rl",
+    )
+
 # Rate Limiter
-limiter = Limiter(key_func=get_remote_address)
+limiter = create_limiter(settings.REDIS_URL)
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
@@ -49,39 +72,63 @@ app.add_middleware(
 app.add_middleware(GZipMiddleware, minimum_size=1000)
 
 # Security Headers Middleware
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next: Callable):
-        response = await call_next(request)
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Content-Security-Policy"] = "default-src 'self'"
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-        return response
+SECURITY_HEADERS: List[Tuple[bytes, bytes]] = [
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+    (b"x-xss-protection", b"1; mode=block"),
+    (b"content-security-policy", b"default-src 'self'"),
+    (b"strict-transport-security", b"max-age=31536000; includeSubDomains"),
+]
 
-app.add_middleware(SecurityHeadersMiddleware)
+class SecurityHeadersMiddleware:
+    """Adds the security headers and logs each request in a single ASGI layer."""
 
-# Request Logging Middleware
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    start_time = time.time()
-    response = await call_next(request)
-    process_time = time.time() - start_time
-    
-    logger.info(
-        "Request processed",
-        method=request.method,
-        url=str(request.url),
-        status_code=response.status_code,
-        process_time=process_time
-    )
-    
-    return response
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = list(message.get("headers", [])) + SECURITY_HEADERS
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+        # Request logging
+        if is_enabled_for(logging.INFO):
+            logger.info(
+                "Request processed",
+                method=scope["method"],
+                path=scope["path"],
+                status_code=status_code,
+                process_time=time.perf_counter() - start_time
+            )
+
+app.add_middleware(SecurityHeadersMiddleware)
 
 # Error Handler
+RATE_LIMIT_LOG_SAMPLE_RATE = 0.01
+
 @app.exception_handler(APIException)
 async def api_exception_handler(request: Request, exc: APIException):
-    return JSONResponse(
+    # Rate limit rejections can spike, so only a sample of them is logged
+    if exc.status_code != 429 or random.random() < RATE_LIMIT_LOG_SAMPLE_RATE:
+        logger.error(
+            "API Error",
+            status_code=exc.status_code,
+            detail=exc.detail,
+            error_code=exc.error_code
+        )
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={
             "error": exc.detail,
@@ -89,15 +136,25 @@ async def api_exception_handler(request: Request, exc: APIException):
         }
     )
 
-# Custom Swagger UI
+# Custom Swagger UI, rendered once
+DOCS_HTML = get_swagger_ui_html(
+    openapi_url="/openapi.json",
+    title="Genealogy DNA Analysis API - Swagger UI",
+    swagger_js_url="https://cdn.jsdelivr.net/npm/swagger-ui-dist@5/swagger-ui-bundle.js",
+    swagger_css_url="https://cdn.jsdelivr.net/npm/swagger-ui-dist@5/swagger-ui.css",
+).body
+REDOC_HTML = get_redoc_html(
+    openapi_url="/openapi.json",
+    title="Genealogy DNA Analysis API - ReDoc",
+).body
+
 @app.get("/docs", include_in_schema=False)
 async def custom_swagger_ui_html():
-    return get_swagger_ui_html(
-        openapi_url="/openapi.json",
-        title="Genealogy DNA Analysis API - Swagger UI",
-        swagger_js_url="https://cdn.jsdelivr.net/npm/swagger-ui-dist@5/swagger-ui-bundle.js",
-        swagger_css_url="https://cdn.jsdelivr.net/npm/swagger-ui-dist@5/swagger-ui.css",
-    )
+    return Response(content=DOCS_HTML, media_type="text/html")
+
+@app.get("/redoc", include_in_schema=False)
+async def redoc_html():
+    return Response(content=REDOC_HTML, media_type="text/html")
 
 # OpenAPI Schema
 def custom_openapi():
@@ -114,16 +171,37 @@ def custom_openapi():
 
 app.openapi = custom_openapi
 
+# Encoded on first request, once every route has been registered
+OPENAPI_JSON: Optional[bytes] = None
+
+@app.get("/openapi.json", include_in_schema=False)
+async def openapi_json():
+    global OPENAPI_JSON
+    if OPENAPI_JSON is None:
+        OPENAPI_JSON = msgspec.json.encode(app.openapi())
+    return Response(content=OPENAPI_JSON, media_type="application/json")
+
 # Include routers
 app.include_router(relationships.router, prefix="/api/v1", tags=["relationships"])
 app.include_router(dna_analysis.router, prefix="/api/v1", tags=["dna-analysis"])
 
+# Static bodies, encoded once
+ROOT_JSON = msgspec.json.encode({"message": "Welcome to the Genealogy DNA Analysis API"})
+HEALTH_JSON = msgspec.json.encode({"status": "healthy"})
+
 @app.get("/")
 async def root():
-    return {"message": "Welcome to the Genealogy DNA Analysis API"}
+    return Response(content=ROOT_JSON, media_type="application/json")
+
+# Pydantic models for requests
+class RelationshipCalculationRequest(BaseModel):
+    cm: float = Field(..., gt=0, description="Centimorgans must be greater than 0")
+    generacion: Optional[int] = Field(None, ge=0, description="Generation must be non-negative")
+    sexo: Optional[str] = Field(None, pattern="^[MF]$", description="Sex must be either M or F")
+    x_inheritance: Optional[bool] = None
 
-# Pydantic models for request/response
-class RelationshipBase(BaseModel):
+# msgspec structs for responses, encoded straight to JSON bytes
+class RelationshipBase(msgspec.Struct, frozen=True):
     code: str
     nombre: str
     abreviado: str
@@ -131,30 +209,24 @@ class RelationshipBase(BaseModel):
     min_cm: float
     max_cm: float
 
-class DistributionBase(BaseModel):
+class DistributionBase(msgspec.Struct, frozen=True):
     range: str
     percentage: float
 
-class ProbabilityBase(BaseModel):
+class ProbabilityBase(msgspec.Struct, frozen=True):
     cm: float
     probability: float
 
-class XInheritanceBase(BaseModel):
+class XInheritanceBase(msgspec.Struct, frozen=True):
     sex_combination: str
     can_share: bool
 
-class RelationshipResponse(RelationshipBase):
+class RelationshipResponse(RelationshipBase, frozen=True):
     distributions: List[DistributionBase]
     probabilities: List[ProbabilityBase]
     x_inheritance: List[XInheritanceBase]
 
-class RelationshipCalculationRequest(BaseModel):
-    cm: float = Field(..., gt=0, description="Centimorgans must be greater than 0")
-    generacion: Optional[int] = Field(None, ge=0, description="Generation must be non-negative")
-    sexo: Optional[str] = Field(None, pattern="^[MF]$", description="Sex must be either M or F")
-    x_inheritance: Optional[bool] = None
-
-class RelationshipCalculationResponse(BaseModel):
+class RelationshipCalculationResponse(msgspec.Struct, frozen=True):
     code: str
     nombre: str
     abreviado: str
@@ -163,73 +235,179 @@ class RelationshipCalculationResponse(BaseModel):
     max_cm: float
     probabilidad: float
 
-class HistogramResponse(BaseModel):
+class HistogramResponse(msgspec.Struct, frozen=True):
     bins: List[float]
     counts: List[int]
 
-# Endpoints
-@app.get("/api/relationships", response_model=List[RelationshipResponse])
-def get_relationships(cm: float, db: Session = Depends(get_db)):
-    relationships = db.query(models.Relationship).filter(
-        models.Relationship.min_cm <= cm,
-        models.Relationship.max_cm >= cm
+# Reference tables, loaded once at startup and served from memory
+RELATIONSHIPS: Dict[str, models.Relationship] = {}
+# Probability curves as sorted (cm, probability) arrays
+PROBABILITY_CURVES: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+# Sex combination -> can_share, in stored order
+X_INHERITANCE: Dict[str, Dict[str, bool]] = {}
+# Serialized /histogram bodies keyed by relationship code
+HISTOGRAM_JSON: Dict[str, bytes] = {}
+# Serialized /api/relationships bodies keyed by cM bucket (see cm_bucket)
+RELATIONSHIPS_JSON: Dict[int, bytes] = {}
+# Sorted distinct min_cm/max_cm values; matches only change at these points
+CM_BOUNDARIES: List[float] = []
+
+class PackedRelationships(NamedTuple):
+    """Structure-of-arrays view of RELATIONSHIPS for compute_probabilities."""
+    codes: List[str]
+    curve_cm: np.ndarray  # (N, K) curve points, padded with +inf
+    curve_p: np.ndarray  # (N, K) curve probabilities, padded with 0
+    curve_len: np.ndarray  # (N,) number of real points per curve
+    min_cm: np.ndarray
+    max_cm: np.ndarray
+    generacion: np.ndarray
+    x_first_can_share: np.ndarray  # first stored sex combination, True if none
+
+PACKED: Optional[PackedRelationships] = None
+
+def pack_relationships() -> PackedRelationships:
+    codes = list(RELATIONSHIPS)
+    # At least one column so rows without a curve still index cleanly
+    width = max([len(PROBABILITY_CURVES.get(code, ((), ()))[0]) for code in codes] + [1])
+    curve_cm = np.full((len(codes), width), np.inf)
+    curve_p = np.zeros((len(codes), width))
+    curve_len = np.zeros(len(codes), dtype=np.intp)
+    for i, code in enumerate(codes):
+        cm_points, p_points = PROBABILITY_CURVES.get(code, ((), ()))
+        curve_len[i] = len(cm_points)
+        curve_cm[i, :len(cm_points)] = cm_points
+        curve_p[i, :len(p_points)] = p_points
+    rels = [RELATIONSHIPS[code] for code in codes]
+    return PackedRelationships(
+        codes=codes,
+        curve_cm=curve_cm,
+        curve_p=curve_p,
+        curve_len=curve_len,
+        min_cm=np.array([rel.min_cm for rel in rels], dtype=float),
+        max_cm=np.array([rel.max_cm for rel in rels], dtype=float),
+        generacion=np.array([rel.generacion for rel in rels], dtype=float),
+        x_first_can_share=np.array(
+            [next(iter(X_INHERITANCE[code].values()), True) for code in codes], dtype=bool
+        ),
+    )
+
+# Curves are padded with inf, so inf - inf in the padded slots yields NaN; those rows are masked out below
+@np.errstate(invalid="ignore")
+def compute_probabilities(
+    packed: PackedRelationships,
+    cm: float,
+    generacion: Optional[int],
+    x_inheritance: Optional[bool]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Return (matching row indices, probabilities) for every relationship at once.
+
+    Matches the per-segment linear interpolation over each sorted curve: 0 outside
+    the curve and for curves with fewer than two points, since they have no segment.
+    This is np.interp(cm, curve_cm, curve_p, left=0, right=0) per row except for
+    single-point curves, followed by the generation and X inheritance adjustments.
+    """
+    rows = np.arange(len(packed.codes))
+    n = packed.curve_len
+    # Index of the first curve point >= cm, i.e. the right end of the bracketing segment
+    hi = np.minimum((packed.curve_cm < cm).sum(axis=1), np.maximum(n - 1, 0))
+    lo = np.maximum(hi - 1, 0)
+    x_lo, x_hi = packed.curve_cm[rows, lo], packed.curve_cm[rows, hi]
+    p_lo, p_hi = packed.curve_p[rows, lo], packed.curve_p[rows, hi]
+    span = x_hi - x_lo
+    t = np.divide(cm - x_lo, span, out=np.zeros_like(span), where=(span > 0) & (cm > x_lo))
+    probs = p_lo + t * (p_hi - p_lo)
+    # Outside the curve (or without at least one segment) the probability is 0
+    last = packed.curve_cm[rows, np.maximum(n - 1, 0)]
+    inside = (n >= 2) & (cm >= packed.curve_cm[:, 0]) & (cm <= last)
+    probs = np.where(inside, probs, 0.0)
+
+    # Simple adjustment: reduce probability for mismatched generations
+    if generacion is not None:
+        probs = np.where(np.abs(packed.generacion - generacion) > 1, probs * 0.5, probs)
+    # Only the first stored sex combination is checked
+    if x_inheritance:
+        probs = np.where(packed.x_first_can_share, probs, probs * 0.1)
+
+    matches = np.flatnonzero((packed.min_cm <= cm) & (cm <= packed.max_cm))
+    return matches, probs[matches]
+
+def load_reference_data(db: Session) -> None:
+    # selectinload (one IN query per collection) avoids a cartesian product across the child tables
+    relationships = db.query(models.Relationship).options(
+        selectinload(models.Relationship.distributions),
+        selectinload(models.Relationship.probabilities),
+        selectinload(models.Relationship.x_inheritance)
     ).all()
-    
-    result = []
+    RELATIONSHIPS.clear()
+    PROBABILITY_CURVES.clear()
+    X_INHERITANCE.clear()
+    HISTOGRAM_JSON.clear()
+    RELATIONSHIPS_JSON.clear()
     for rel in relationships:
-        distributions = db.query(models.Distribution).filter(models.Distribution.relationship_code == rel.code).all()
-        probabilities = db.query(models.Probability).filter(models.Probability.relationship_code == rel.code).all()
-        x_inheritance = db.query(models.XInheritance).filter(models.XInheritance.relationship_code == rel.code).all()
-        
+        RELATIONSHIPS[rel.code] = rel
+        curve = sorted((p.cm, p.probability) for p in rel.probabilities)
+        if curve:
+            cm_points, p_points = zip(*curve)
+            PROBABILITY_CURVES[rel.code] = (np.array(cm_points, dtype=float), np.array(p_points, dtype=float))
+        X_INHERITANCE[rel.code] = {
+            x.sex_combination: x.can_share for x in sorted(rel.x_inheritance, key=lambda x: x.id)
+        }
+        HISTOGRAM_JSON[rel.code] = msgspec.json.encode(build_histogram(rel.code))
+    CM_BOUNDARIES[:] = sorted({rel.min_cm for rel in relationships} | {rel.max_cm for rel in relationships})
+    global PACKED
+    PACKED = pack_relationships()
+
+def cm_bucket(cm: float) -> int:
+    # Even buckets are the open intervals between boundaries, odd ones the boundaries themselves
+    i = bisect_left(CM_BOUNDARIES, cm)
+    on_boundary = i < len(CM_BOUNDARIES) and CM_BOUNDARIES[i] == cm
+    return 2 * i + 1 if on_boundary else 2 * i
+
+def build_histogram(code: str) -> HistogramResponse:
+    cm_points, p_points = PROBABILITY_CURVES.get(code, ((), ()))
+    bins = [float(cm) for cm in cm_points]
+    counts = [int(p * 1000) for p in p_points]  # Scale probabilities for visualization
+    return HistogramResponse(bins=bins, counts=counts)
+
+# Endpoints
+@app.get("/api/relationships")
+def get_relationships(cm: float):
+    bucket = cm_bucket(cm)
+    body = RELATIONSHIPS_JSON.get(bucket)
+    if body is None:
+        body = msgspec.json.encode(build_relationships(cm))
+        RELATIONSHIPS_JSON[bucket] = body
+    return Response(content=body, media_type="application/json")
+
+def build_relationships(cm: float) -> List[RelationshipResponse]:
+    result = []
+    for rel in RELATIONSHIPS.values():
+        if not rel.min_cm <= cm <= rel.max_cm:
+            continue
         result.append(RelationshipResponse(
-            **rel.__dict__,
-            distributions=[DistributionBase(range=d.range, percentage=d.percentage) for d in distributions],
-            probabilities=[ProbabilityBase(cm=p.cm, probability=p.probability) for p in probabilities],
-            x_inheritance=[XInheritanceBase(sex_combination=x.sex_combination, can_share=x.can_share) for x in x_inheritance]
+            code=rel.code,
+            nombre=rel.nombre,
+            abreviado=rel.abreviado,
+            promedio_cm=rel.promedio_cm,
+            min_cm=rel.min_cm,
+            max_cm=rel.max_cm,
+            distributions=[DistributionBase(range=d.range, percentage=d.percentage) for d in rel.distributions],
+            probabilities=[ProbabilityBase(cm=p.cm, probability=p.probability) for p in rel.probabilities],
+            x_inheritance=[XInheritanceBase(sex_combination=x.sex_combination, can_share=x.can_share) for x in rel.x_inheritance]
         ))
     return result
 
-@app.post("/api/relationships/calculate", response_model=List[RelationshipCalculationResponse])
-def calculate_relationships(request: RelationshipCalculationRequest, db: Session = Depends(get_db)):
-    # Get all relationships that match the cM range
-    relationships = db.query(models.Relationship).filter(
-        models.Relationship.min_cm <= request.cm,
-        models.Relationship.max_cm >= request.cm
-    ).all()
+@app.post("/api/relationships/calculate")
+def calculate_relationships(request: RelationshipCalculationRequest):
+    # Score every relationship in one pass and keep those whose cM range matches
+    matches, probs = compute_probabilities(PACKED, request.cm, request.generacion, request.x_inheritance)
     
-    if not relationships:
+    if not len(matches):
         raise HTTPException(status_code=404, detail="No relationships found for the given cM value")
     
     results = []
-    for rel in relationships:
-        # Get probability curve
-        probabilities = db.query(models.Probability).filter(
-            models.Probability.relationship_code == rel.code
-        ).order_by(models.Probability.cm).all()
-        
-        # Calculate base probability
-        base_prob = 0
-        for i in range(len(probabilities) - 1):
-            if request.cm >= probabilities[i].cm and request.cm <= probabilities[i+1].cm:
-                A = probabilities[i]
-                B = probabilities[i+1]
-                base_prob = A.probability + ((request.cm - A.cm)/(B.cm - A.cm))*(B.probability - A.probability)
-                break
-        
-        # Adjust probability based on generation if provided
-        if request.generacion is not None:
-            # Simple adjustment: reduce probability for mismatched generations
-            if abs(rel.generacion - request.generacion) > 1:
-                base_prob *= 0.5
-        
-        # Adjust probability based on X inheritance if provided
-        if request.x_inheritance is not None:
-            x_inheritance = db.query(models.XInheritance).filter(
-                models.XInheritance.relationship_code == rel.code
-            ).first()
-            if x_inheritance and not x_inheritance.can_share and request.x_inheritance:
-                base_prob *= 0.1
-        
+    for i, base_prob in zip(matches.tolist(), probs.tolist()):
+        rel = RELATIONSHIPS[PACKED.codes[i]]
         results.append(RelationshipCalculationResponse(
             code=rel.code,
             nombre=rel.nombre,
@@ -240,36 +418,31 @@ def calculate_relationships(request: RelationshipCalculationRequest, db: Session
             probabilidad=base_prob
         ))
     
-    return results
+    return Response(content=msgspec.json.encode(results), media_type="application/json")
 
-@app.get("/api/relationships/{code}/histogram", response_model=HistogramResponse)
-def get_histogram(code: str, db: Session = Depends(get_db)):
-    # Get the relationship
-    relationship = db.query(models.Relationship).filter(models.Relationship.code == code).first()
-    if not relationship:
+@app.get("/api/relationships/{code}/histogram")
+def get_histogram(code: str):
+    body = HISTOGRAM_JSON.get(code)
+    if body is None:
         raise HTTPException(status_code=404, detail="Relationship not found")
-    
-    # Get all probabilities for this relationship
-    probabilities = db.query(models.Probability).filter(
-        models.Probability.relationship_code == code
-    ).order_by(models.Probability.cm).all()
-    
-    # Create histogram data
-    bins = [p.cm for p in probabilities]
-    counts = [int(p.probability * 1000) for p in probabilities]  # Scale probabilities for visualization
-    
-    return HistogramResponse(bins=bins, counts=counts)
+    return Response(content=body, media_type="application/json")
 
 # Health check endpoint
 @app.get("/health")
 @limiter.limit("5/minute")
 async def health_check(request: Request):
-    return {"status": "healthy"}
+    return Response(content=HEALTH_JSON, media_type="application/json")
 
 # Log startup
 @app.on_event("startup")
 async def startup_event():
+    start_log_writer()
     logger.info("Starting Relationship Calculator API")
+    db = database.SessionLocal()
+    try:
+        load_reference_data(db)
+    finally:
+        db.close()
     logger.info(f"CORS origins: {settings.CORS_ORIGINS}")
     logger.info(f"Rate limit: {settings.RATE_LIMIT_PER_MINUTE} requests/minute")
 
@@ -280,9 +453,14 @@ async def shutdown_event():
 
 if __name__ == "__main__":
     import uvicorn
+    reload = settings.ENVIRONMENT == "development"
     uvicorn.run(
         "app.main:app",
         host=settings.HOST,
         port=settings.PORT,
-        reload=True
+        loop="uvloop",
+        http="httptools",
+        # uvicorn only supports a single worker with reload enabled
+        workers=1 if reload else os.cpu_count(),
+        reload=reload
     ) 
\ No newline at end of file
@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Integer, String, Float, JSON, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Float, JSON, ForeignKey, Boolean, Index
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import relationship
 
 Base = declarative_base()
 
 class Relationship(Base):
     __tablename__ = "relationships"
+    __table_args__ = (
+        Index("ix_relationships_cm_range", "min_cm", "max_cm"),
+    )
     
     code = Column(String, primary_key=True)
     nombre = Column(String, nullable=False)
@@ -14,6 +18,10 @@ class Relationship(Base):
     max_cm = Column(Float, nullable=False)
     generacion = Column(Integer, nullable=False)  # Generación de la relación (1 para hermanos, 2 para primos, etc.)
 
+    distributions = relationship("Distribution", back_populates="relationship")
+    probabilities = relationship("Probability", back_populates="relationship")
+    x_inheritance = relationship("XInheritance", back_populates="relationship")
+
 class Distribution(Base):
     __tablename__ = "distributions"
     
@@ -22,18 +30,27 @@ class Distribution(Base):
     range = Column(String, nullable=False)
     percentage = Column(Float, nullable=False)
 
+    relationship = relationship("Relationship", back_populates="distributions")
+
 class Probability(Base):
     __tablename__ = "probabilities"
+    __table_args__ = (
+        Index("ix_prob_code_cm", "relationship_code", "cm"),
+    )
     
     id = Column(Integer, primary_key=True)
     relationship_code = Column(String, ForeignKey("relationships.code"), nullable=False)
     cm = Column(Float, nullable=False)
     probability = Column(Float, nullable=False)
 
+    relationship = relationship("Relationship", back_populates="probabilities")
+
 class XInheritance(Base):
     __tablename__ = "x_inheritance"
     
     id = Column(Integer, primary_key=True)
     relationship_code = Column(String, ForeignKey("relationships.code"), nullable=False)
     sex_combination = Column(String, nullable=False)  # Format: "F>M", "M>F", etc.
-    can_share = Column(Boolean, nullable=False) 
\ No newline at end of file
+    can_share = Column(Boolean, nullable=False)
+
+    relationship = relationship("Relationship", back_populates="x_inheritance") 
\ No newline at end of file
@@ -9,4 +9,15 @@ router = APIRouter()
 @router.get("/relationships")
 def get_relationships(db: Session = Depends(get_db)):
     relationships = db.query(models.Relationship).all()
-    return relationships 
\ No newline at end of file
+    return [
+        {
+            "code": rel.code,
+            "nombre": rel.nombre,
+            "abreviado": rel.abreviado,
+            "promedio_cm": rel.promedio_cm,
+            "min_cm": rel.min_cm,
+            "max_cm": rel.max_cm,
+            "generacion": rel.generacion
+        }
+        for rel in relationships
+    ] 
\ No newline at end of file
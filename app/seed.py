@@ -1,4 +1,4 @@
-import json
+import orjson
 from sqlalchemy.orm import Session
 from . import models
 import os
@@ -7,17 +7,17 @@ def load_json_data():
     base_path = os.path.dirname(os.path.abspath(__file__))
     data_path = os.path.join(os.path.dirname(base_path), 'data')
     
-    with open(os.path.join(data_path, 'relationships.json'), 'r') as f:
-        relationships = json.load(f)
+    with open(os.path.join(data_path, 'relationships.json'), 'rb') as f:
+        relationships = orjson.loads(f.read())
     
-    with open(os.path.join(data_path, 'distribuciones.json'), 'r') as f:
-        distributions = json.load(f)
+    with open(os.path.join(data_path, 'distribuciones.json'), 'rb') as f:
+        distributions = orjson.loads(f.read())
     
-    with open(os.path.join(data_path, 'probabilidades.json'), 'r') as f:
-        probabilities = json.load(f)
+    with open(os.path.join(data_path, 'probabilidades.json'), 'rb') as f:
+        probabilities = orjson.loads(f.read())
     
-    with open(os.path.join(data_path, 'xInheritance.json'), 'r') as f:
-        x_inheritance = json.load(f)
+    with open(os.path.join(data_path, 'xInheritance.json'), 'rb') as f:
+        x_inheritance = orjson.loads(f.read())
     
     return relationships, distributions, probabilities, x_inheritance
 
@@ -26,52 +26,53 @@ def seed_database(db: Session):
     
     # Seed relationships first
     print("Seeding relationships...")
-    for rel in relationships:
-        db_relationship = models.Relationship(
-            code=rel['code'],
-            nombre=rel['nombre'],
-            abreviado=rel['abreviado'],
-            promedio_cm=rel['promedio_cm'],
-            min_cm=rel['min_cm'],
-            max_cm=rel['max_cm']
-        )
-        db.add(db_relationship)
-    db.commit()
+    db.bulk_insert_mappings(models.Relationship, [
+        {
+            'code': rel['code'],
+            'nombre': rel['nombre'],
+            'abreviado': rel['abreviado'],
+            'promedio_cm': rel['promedio_cm'],
+            'min_cm': rel['min_cm'],
+            'max_cm': rel['max_cm']
+        }
+        for rel in relationships
+    ])
     
     # Seed distributions
     print("Seeding distributions...")
-    for code, ranges in distributions.items():
-        for range_str, percentage in ranges.items():
-            db_distribution = models.Distribution(
-                relationship_code=code,
-                range=range_str,
-                percentage=percentage
-            )
-            db.add(db_distribution)
-    db.commit()
+    db.bulk_insert_mappings(models.Distribution, [
+        {
+            'relationship_code': code,
+            'range': range_str,
+            'percentage': percentage
+        }
+        for code, ranges in distributions.items()
+        for range_str, percentage in ranges.items()
+    ])
     
     # Seed probabilities
     print("Seeding probabilities...")
-    for code, curve in probabilities.items():
-        for point in curve:
-            db_probability = models.Probability(
-                relationship_code=code,
-                cm=point['cm'],
-                probability=point['p']
-            )
-            db.add(db_probability)
-    db.commit()
+    db.bulk_insert_mappings(models.Probability, [
+        {
+            'relationship_code': code,
+            'cm': point['cm'],
+            'probability': point['p']
+        }
+        for code, curve in probabilities.items()
+        for point in curve
+    ])
     
     # Seed x-inheritance
     print("Seeding x-inheritance...")
-    for code, combinations in x_inheritance.items():
-        for sex_combination, can_share in combinations.items():
-            db_x_inheritance = models.XInheritance(
-                relationship_code=code,
-                sex_combination=sex_combination,
-                can_share=can_share
-            )
-            db.add(db_x_inheritance)
-    db.commit()
+    db.bulk_insert_mappings(models.XInheritance, [
+        {
+            'relationship_code': code,
+            'sex_combination': sex_combination,
+            'can_share': can_share
+        }
+        for code, combinations in x_inheritance.items()
+        for sex_combination, can_share in combinations.items()
+    ])
     
-    print("Database seeding completed successfully!") 
\ No newline at end of file
+    db.commit()
+    print("Database seeding completed successfully!")
\ No newline at end of file
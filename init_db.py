@@ -1,6 +1,6 @@
 from database import engine, Base
 from models import Relationship, Distribution
-import json
+import orjson
 import os
 
 def init_db():
@@ -11,12 +11,12 @@ def init_db():
     data_dir = os.path.join(os.path.dirname(__file__), "data")
     
     # Load relationships
-    with open(os.path.join(data_dir, "relationships.json"), "r") as f:
-        relationships = json.load(f)
+    with open(os.path.join(data_dir, "relationships.json"), "rb") as f:
+        relationships = orjson.loads(f.read())
     
     # Load distributions
-    with open(os.path.join(data_dir, "distribuciones.json"), "r") as f:
-        distributions = json.load(f)
+    with open(os.path.join(data_dir, "distribuciones.json"), "rb") as f:
+        distributions = orjson.loads(f.read())
 
     # Create database session
     from sqlalchemy.orm import Session
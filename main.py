@@ -1,18 +1,22 @@
 # backend/main.py
-import json
+import orjson
 import os
+import hashlib
+import asyncio
 import logging
-from fastapi import FastAPI, HTTPException, Request, Depends
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel, Field
-from typing import Optional, Union, Literal, List
-import math
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
+from pydantic import BaseModel, Field, field_validator
+from typing import Optional, Literal, List, Dict, Mapping, Tuple, get_args
+import numpy as np
 import time
-from collections import defaultdict
-from fastapi.staticfiles import StaticFiles
+from types import MappingProxyType
+from functools import lru_cache
+from collections import OrderedDict
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from fastapi.openapi.docs import get_swagger_ui_html
 from fastapi.openapi.utils import get_openapi
 from app.config import settings
@@ -31,44 +35,137 @@ app = FastAPI(
     version="1.0.0",
     docs_url=None,  # Deshabilitamos la documentación por defecto
     redoc_url=None,
+    openapi_url=None,  # /openapi.json se sirve abajo desde bytes cacheados
+    default_response_class=ORJSONResponse,
 )
 
-# Configuración de rate limiting
+# Configuración de rate limiting (token bucket por IP)
 RATE_LIMIT_PER_MINUTE = 60
-request_counts = defaultdict(list)
-
-async def rate_limit_middleware(request: Request, call_next):
-    # No aplicar rate limiting para el cliente de test
-    client_host = getattr(request.client, "host", None) if request.client else None
-    if str(client_host) == "testclient":
-        response = await call_next(request)
-        return response
-        
-    client_ip = client_host
-    current_time = time.time()
+# Máximo de IPs distintas que se recuerdan a la vez
+RATE_LIMIT_MAX_CLIENTS = 100_000
+# Segundos entre barridos de buckets inactivos
+RATE_LIMIT_SWEEP_INTERVAL = 60
+# IP -> (tokens disponibles, instante monotónico de la última recarga), de la menos a la más reciente
+rate_limit_buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+def store_bucket(client_ip: str, tokens: float, current_time: float):
+    """
+    Guarda el bucket de la IP y descarta los de clientes inactivos o sobrantes
+    """
+    rate_limit_buckets[client_ip] = (tokens, current_time)
+    rate_limit_buckets.move_to_end(client_ip)
+    evict_buckets(current_time)
+
+def evict_buckets(current_time: float):
+    """
+    Descarta, desde el más antiguo, los buckets inactivos o que exceden el máximo de IPs
+    """
+    # Tras 60 s sin peticiones el bucket estaría lleno de nuevo, así que se puede olvidar
+    while rate_limit_buckets:
+        _, (_, oldest_time) = next(iter(rate_limit_buckets.items()))
+        if len(rate_limit_buckets) <= RATE_LIMIT_MAX_CLIENTS and current_time - oldest_time < 60:
+            break
+        rate_limit_buckets.popitem(last=False)
+
+def check_rate_limit(client_ip: str) -> bool:
+    """
+    Consume un token del bucket de la IP; devuelve False si se superó el límite
+    """
+    current_time = time.monotonic()
+    tokens, last_refill = rate_limit_buckets.get(client_ip, (RATE_LIMIT_PER_MINUTE, current_time))
     
-    # Limpiar solicitudes antiguas
-    request_counts[client_ip] = [t for t in request_counts[client_ip] 
-                               if current_time - t < 60] if client_ip else []
+    # Recargar tokens según el tiempo transcurrido
+    tokens = min(RATE_LIMIT_PER_MINUTE, tokens + (current_time - last_refill) * RATE_LIMIT_PER_MINUTE / 60)
     
     # Verificar límite
-    if client_ip and len(request_counts[client_ip]) >= RATE_LIMIT_PER_MINUTE:
-        return JSONResponse(
-            status_code=429,
-            content={"error": "Rate limit exceeded"}
-        )
-    
-    # Registrar nueva solicitud
-    if client_ip:
-        request_counts[client_ip].append(current_time)
+    if tokens < 1:
+        store_bucket(client_ip, tokens, current_time)
+        return False
     
-    response = await call_next(request)
-    return response
+    # Consumir un token por la nueva solicitud
+    store_bucket(client_ip, tokens - 1, current_time)
+    return True
+
+def reset_rate_limits():
+    """
+    Olvida todos los buckets; todas las IPs vuelven a tener el límite completo
+    """
+    rate_limit_buckets.clear()
+
+async def sweep_rate_limit_buckets():
+    """
+    Limpia periódicamente los buckets inactivos aunque no lleguen nuevas peticiones
+    """
+    while True:
+        await asyncio.sleep(RATE_LIMIT_SWEEP_INTERVAL)
+        evict_buckets(time.monotonic())
+        # Tamaño del almacén tras cada barrido, para detectar crecimiento anómalo
+        logger.info("Buckets de rate limit activos: %d", len(rate_limit_buckets))
+
+@app.on_event("startup")
+async def start_rate_limit_sweeper():
+    app.state.rate_limit_sweeper = asyncio.create_task(sweep_rate_limit_buckets())
+
+@app.on_event("shutdown")
+async def stop_rate_limit_sweeper():
+    app.state.rate_limit_sweeper.cancel()
+
+# Respuesta 429 ya renderizada, se reutiliza en cada rechazo
+RATE_LIMIT_RESPONSE = JSONResponse(
+    status_code=429,
+    content={"error": "Rate limit exceeded"}
+)
+
+# Configurar headers de seguridad (ya codificados, se añaden tal cual a cada respuesta)
+SECURITY_HEADERS: List[Tuple[bytes, bytes]] = [
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+    (b"x-xss-protection", b"1; mode=block"),
+    (b"content-security-policy", b"default-src 'self'"),
+    (b"strict-transport-security", b"max-age=31536000; includeSubDomains"),
+]
+
+class RateLimitMiddleware:
+    """
+    Aplica el rate limiting por IP como capa ASGI
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        # No aplicar rate limiting para el cliente de test ni sin IP de cliente
+        client = scope.get("client")
+        if scope["type"] == "http" and client and client[0] != "testclient" and not check_rate_limit(client[0]):
+            await RATE_LIMIT_RESPONSE(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
+
+class SecurityHeadersMiddleware:
+    """
+    Añade los headers de seguridad a todas las respuestas, incluidas las que generan otros middlewares
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + SECURITY_HEADERS
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
 
 # Añadir middleware
-app.middleware("http")(rate_limit_middleware)
+app.add_middleware(RateLimitMiddleware)
 app.add_middleware(GZipMiddleware, minimum_size=1000)
-app.add_middleware(TrustedHostMiddleware, allowed_hosts=["*"])
+# Con "*" el middleware no rechaza nada: solo se registra si hay hosts concretos
+if "*" not in settings.ALLOWED_HOSTS:
+    app.add_middleware(TrustedHostMiddleware, allowed_hosts=settings.ALLOWED_HOSTS)
 
 # Permitir CORS desde cualquier origen (para desarrollo)
 app.add_middleware(
@@ -79,16 +176,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Configurar headers de seguridad
-@app.middleware("http")
-async def add_security_headers(request: Request, call_next):
-    response = await call_next(request)
-    response.headers["X-Content-Type-Options"] = "nosniff"
-    response.headers["X-Frame-Options"] = "DENY"
-    response.headers["X-XSS-Protection"] = "1; mode=block"
-    response.headers["Content-Security-Policy"] = "default-src 'self'"
-    response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-    return response
+# Registrado el último para ser la capa más externa: cubre también los preflight de CORS,
+# los 400 de TrustedHost y los 429 del rate limiting
+app.add_middleware(SecurityHeadersMiddleware)
+
 
 # Obtener la ruta absoluta del directorio actual
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -96,14 +187,83 @@ DATA_DIR = os.path.join(BASE_DIR, "data")
 
 # Cargamos los datos al arrancar la app
 try:
-    with open(os.path.join(DATA_DIR, "relationships.json"), encoding="utf-8") as f:
-        RELS = json.load(f)
-    with open(os.path.join(DATA_DIR, "distribuciones.json"), "r") as f:
-        HISTS = json.load(f)
+    with open(os.path.join(DATA_DIR, "relationships.json"), "rb") as f:
+        # Tupla de entradas de solo lectura: se comparten entre peticiones concurrentes
+        RELS = tuple(MappingProxyType(r) for r in orjson.loads(f.read()))
+    with open(os.path.join(DATA_DIR, "distribuciones.json"), "rb") as f:
+        HISTS = orjson.loads(f.read())
 except FileNotFoundError as e:
     raise RuntimeError(f"Archivo de datos no encontrado: {e.filename}")
 
+# Normalizar los histogramas una sola vez (conteos enteros y {} si el formato no es válido) y congelarlos
+HISTS = MappingProxyType({
+    code: MappingProxyType(
+        {bin_range: int(count) for bin_range, count in hist.items()} if isinstance(hist, dict) else {}
+    )
+    for code, hist in HISTS.items()
+})
+
+# Índice de RELS ordenado por min_cm para buscar por rango sin recorrer toda la lista
+RELS_ORDER = np.argsort([r["min_cm"] for r in RELS], kind="stable")
+MIN_CM_ARR = np.array([RELS[i]["min_cm"] for i in RELS_ORDER], dtype=float)
+MAX_CM_ARR = np.array([RELS[i]["max_cm"] for i in RELS_ORDER], dtype=float)
+
+def find_relationships(cm: float) -> List[Mapping]:
+    """
+    Devuelve las relaciones cuyo rango de cM cubre el valor, en el orden original de RELS
+    """
+    hi = int(np.searchsorted(MIN_CM_ARR, cm, side="right"))
+    idxs = RELS_ORDER[:hi][MAX_CM_ARR[:hi] >= cm]
+    return [RELS[i] for i in sorted(idxs.tolist())]
+
+# Respuestas estáticas serializadas una sola vez
+ROOT_JSON = orjson.dumps({"message": "API en funcionamiento - listo para integrar en el futuro."})
+HIST_JSON: Dict[str, bytes] = {code: orjson.dumps({"histogram": dict(hist)}) for code, hist in HISTS.items()}
+
+def make_etag(body: bytes) -> str:
+    """
+    Calcula el ETag débil de un cuerpo de respuesta; es débil porque GZip puede servir el mismo
+    contenido con otra codificación
+    """
+    return 'W/"' + hashlib.md5(body, usedforsecurity=False).hexdigest() + '"'
+
+def opaque_tag(tag: str) -> str:
+    """
+    Quita el prefijo W/ de un ETag, para la comparación débil de If-None-Match (RFC 9110 §13.1.2)
+    """
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+def cached_json_response(request: Request, body: bytes, etag: str) -> Response:
+    """
+    Responde 304 sin cuerpo si el cliente ya tiene esta versión, o el JSON con su ETag
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (
+        if_none_match.strip() == "*"
+        or opaque_tag(etag) in (opaque_tag(tag) for tag in if_none_match.split(","))
+    ):
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+@lru_cache(maxsize=4000)
+def _relationships_bytes(cm: int) -> Tuple[bytes, str]:
+    """
+    Devuelve el JSON ya serializado de las relaciones posibles para un valor de cM, junto con su ETag
+    """
+    body = orjson.dumps({"results": [dict(r) for r in find_relationships(cm)]})
+    return body, make_etag(body)
+
 EndogamiaLevel = Literal["none", "light", "moderate", "high", "very_high"]
+# Posición de cada nivel de endogamia, para indexar tablas precalculadas
+ENDOGAMIA_INDEX = MappingProxyType({level: i for i, level in enumerate(get_args(EndogamiaLevel))})
+
+# Máximo de análisis por petición en /api/v1/analyze/batch
+MAX_BATCH_ITEMS = 100
+
+# Valores reconocidos para x_inheritance; cualquier otro (null, vacío, etc.) se trata como desconocido
+_X_INHERITANCE_TRUE = frozenset({True, "yes", "y", "true", "t", "on", "1", "si", "sí"})
+_X_INHERITANCE_FALSE = frozenset({False, "no", "n", "false", "f", "off", "0"})
 
 class AnalysisRequest(BaseModel):
     cm: float = Field(..., description="Centimorgans compartidos", gt=0, le=4000)
@@ -111,306 +271,341 @@ class AnalysisRequest(BaseModel):
     person2_age: Optional[int] = Field(None, description="Edad de la segunda persona", ge=0, le=120)
     generacion: Optional[str] = Field(None, description="Generación")
     sexo: Optional[str] = Field(None, description="Sexo")
-    x_inheritance: Optional[Union[bool, str]] = Field(None, description="Herencia del cromosoma X")
+    x_inheritance: Optional[bool] = Field(None, description="Herencia del cromosoma X")
     segments: Optional[int] = Field(None, description="Número de segmentos", ge=0)
     largest_segment: Optional[float] = Field(None, description="Tamaño del segmento más grande", gt=0)
     endogamia: Optional[EndogamiaLevel] = Field(None, description="Nivel de endogamia en la familia")
 
-def adjust_cm_for_endogamia(cm: float, endogamia: Optional[EndogamiaLevel], relationship_code: str) -> float:
-    """
-    Ajusta los cM compartidos según el nivel de endogamia y tipo de relación
-    """
-    if not endogamia:
-        return float(cm)
-    
-    # Factores de ajuste actualizados según tipo de relación
-    close_relationship_factors = {
+    @field_validator("x_inheritance", mode="before")
+    @classmethod
+    def normalize_x_inheritance(cls, value):
+        """
+        Acepta booleanos o textos tipo sí/no y los reduce a True, False o None
+        """
+        if isinstance(value, str):
+            value = value.strip().lower()
+        # Solo los valores escalares se buscan en los conjuntos (listas o dicts no son hashables)
+        if isinstance(value, (bool, int, float, str)):
+            if value in _X_INHERITANCE_TRUE:
+                return True
+            if value in _X_INHERITANCE_FALSE:
+                return False
+        return None
+
+    @property
+    def endogamia_idx(self) -> Optional[int]:
+        return None if self.endogamia is None else ENDOGAMIA_INDEX[self.endogamia]
+
+class AnalysisBatchRequest(BaseModel):
+    items: List[AnalysisRequest] = Field(..., description="Análisis a realizar", min_length=1, max_length=MAX_BATCH_ITEMS)
+
+# Constantes de puntuación, construidas una sola vez en lugar de en cada llamada
+_WEIGHTS = MappingProxyType({
+    'cm_distance': 0.30,
+    'range_fit': 0.20,
+    'segments': 0.20,
+    'largest_segment': 0.15,
+    'x_match': 0.05,
+    'age_match': 0.10
+})
+# Pesos en el orden fijo de los factores, para desempaquetarlos sin buscar por clave
+_WEIGHT_VALUES = tuple(_WEIGHTS.values())
+
+# Factores de ajuste por endogamia según tipo de relación (cercana, lejana)
+_ENDOGAMIA_FACTORS = MappingProxyType({
+    True: MappingProxyType({
         "none": 1.0,
         "light": 1.1,
         "moderate": 1.2,
         "high": 1.3,
         "very_high": 1.4
-    }
-    
-    distant_relationship_factors = {
+    }),
+    False: MappingProxyType({
         "none": 1.0,
         "light": 1.3,
         "moderate": 1.5,
         "high": 1.8,
         "very_high": 2.0
-    }
-    
-    # Determinar si es una relación cercana o lejana
-    close_relationships = {"FS", "1C", "2C", "HS", "PC", "GP", "AU"}
-    is_close_relationship = relationship_code in close_relationships
-    
-    # Seleccionar el factor de ajuste apropiado
-    adjustment_factors = close_relationship_factors if is_close_relationship else distant_relationship_factors
-    
-    # Aplicar el factor de ajuste y asegurar que el resultado sea un float
-    adjusted_cm = float(cm) / float(adjustment_factors[endogamia])
-    
-    return adjusted_cm
+    })
+})
+_CLOSE_RELATIONSHIPS = frozenset({"FS", "1C", "2C", "HS", "PC", "GP", "AU"})
+
+# Rangos típicos de diferencia de edad por relación
+_AGE_DIFF_RANGES = MappingProxyType({
+    "FS": (0, 5),      # Hermanos completos
+    "1C": (0, 10),     # Primos hermanos
+    "2C": (0, 20),     # Primos segundos
+    "3C": (0, 30),     # Primos terceros
+    "4C": (0, 40),     # Primos cuartos
+    "GAU": (20, 40),   # Tío/a abuelo/a
+    "GGAU": (40, 60),  # Tío/a bisabuelo/a
+    "1C1R": (15, 35),  # Primo hermano una vez removido
+    "1C2R": (30, 50),  # Primo hermano dos veces removido
+    "H1C": (0, 15)     # Medio primo hermano
+})
+
+_SEGMENT_RANGES = MappingProxyType({
+    "FS": (35, 45),
+    "1C": (25, 35),
+    "2C": (10, 20),
+    "3C": (3, 10),
+    "4C": (2, 5)
+})
 
-def calculate_age_probability(rel, request):
+_LARGEST_SEGMENT_RANGES = MappingProxyType({
+    "FS": (150, 250),
+    "1C": (80, 150),
+    "2C": (50, 100),
+    "3C": (15, 60),
+    "4C": (10, 30)
+})
+
+_X_PATTERNS = MappingProxyType({
+    "FS": True,
+    "1C": None,
+    "2C": None,
+    "3C": None,
+    "4C": None
+})
+
+def _range_arrays(ranges):
     """
-    Calcula la probabilidad basada en la diferencia de edad
+    Devuelve (mínimos, máximos, máscara) por relación de RELS para una tabla de rangos por código
     """
-    if request.person1_age is None or request.person2_age is None:
-        return 0.5  # Valor neutral si no hay información de edad
-    
-    age_diff = abs(float(request.person1_age) - float(request.person2_age))
-    
-    # Definir rangos típicos de diferencia de edad por relación
-    age_diff_ranges = {
-        "FS": (0, 5),      # Hermanos completos
-        "1C": (0, 10),     # Primos hermanos
-        "2C": (0, 20),     # Primos segundos
-        "3C": (0, 30),     # Primos terceros
-        "4C": (0, 40),     # Primos cuartos
-        "GAU": (20, 40),   # Tío/a abuelo/a
-        "GGAU": (40, 60),  # Tío/a bisabuelo/a
-        "1C1R": (15, 35),  # Primo hermano una vez removido
-        "1C2R": (30, 50),  # Primo hermano dos veces removido
-        "H1C": (0, 15)     # Medio primo hermano
-    }
-    
-    if rel["code"] not in age_diff_ranges:
-        return 0.5
-    
-    min_diff, max_diff = age_diff_ranges[rel["code"]]
-    
-    # Si la diferencia de edad está dentro del rango esperado
-    if min_diff <= age_diff <= max_diff:
-        # Calcular qué tan cerca está del centro del rango
-        range_center = float(min_diff + max_diff) / 2.0
-        range_size = float(max_diff - min_diff)
-        distance_to_center = abs(age_diff - range_center)
-        return float(1.0 - (distance_to_center / (range_size / 2.0)))
-    
-    # Si está fuera del rango, penalizar más cuanto más lejos esté
-    if age_diff < min_diff:
-        return float(max(0.0, 1.0 - (min_diff - age_diff) / 10.0))
-    else:
-        return float(max(0.0, 1.0 - (age_diff - max_diff) / 10.0))
+    has_range = np.array([r["code"] in ranges for r in RELS])
+    bounds = [ranges.get(r["code"], (0, 0)) for r in RELS]
+    return (
+        np.array([b[0] for b in bounds], dtype=float),
+        np.array([b[1] for b in bounds], dtype=float),
+        has_range
+    )
 
-def calculate_probability(rel, request):
+# Columnas de RELS como arreglos, para puntuar todas las relaciones en una sola pasada
+_PROMEDIO_CM = np.array([r["promedio_cm"] for r in RELS], dtype=float)
+_MIN_CM = np.array([r["min_cm"] for r in RELS], dtype=float)
+_MAX_CM = np.array([r["max_cm"] for r in RELS], dtype=float)
+_IS_CLOSE = np.array([r["code"] in _CLOSE_RELATIONSHIPS for r in RELS])
+# Divisor de cM por endogamia: una fila por nivel (en el orden de ENDOGAMIA_INDEX), una columna por relación
+_ENDOGAMIA_DIVISORS = np.array([
+    np.where(_IS_CLOSE, _ENDOGAMIA_FACTORS[True][level], _ENDOGAMIA_FACTORS[False][level])
+    for level in ENDOGAMIA_INDEX
+])
+_SEG_MIN, _SEG_MAX, _HAS_SEG = _range_arrays(_SEGMENT_RANGES)
+_LS_MIN, _LS_MAX, _HAS_LS = _range_arrays(_LARGEST_SEGMENT_RANGES)
+_AGE_MIN, _AGE_MAX, _HAS_AGE = _range_arrays(_AGE_DIFF_RANGES)
+# Centros y semirrangos fijos: no dependen de la petición
+_CM_RANGE_CENTER = (_MIN_CM + _MAX_CM) / 2
+_CM_RANGE_SIZE = _MAX_CM - _MIN_CM
+_CM_HALF_RANGE = _CM_RANGE_SIZE / 2
+_AGE_CENTER = (_AGE_MIN + _AGE_MAX) / 2.0
+_AGE_HALF_RANGE = (_AGE_MAX - _AGE_MIN) / 2.0
+_X_EXPECTED = [_X_PATTERNS.get(r["code"]) for r in RELS]
+_X_EXPECTED_TRUE = np.array([x is True for x in _X_EXPECTED])
+_X_EXPECTED_FALSE = np.array([x is False for x in _X_EXPECTED])
+_X_EXPECTED_NONE = np.array([x is None for x in _X_EXPECTED])
+_GENERACION = np.array([None if r.get("generacion") is None else str(r["generacion"]) for r in RELS], dtype=object)
+_HAS_GENERACION = np.array([g is not None for g in _GENERACION])
+
+def _segment_scores(value, min_seg, max_seg, has_range):
     """
-    Calcula la probabilidad ajustada basada en múltiples factores
+    Puntuación de un conteo o tamaño de segmento frente al rango esperado de cada relación
     """
-    WEIGHTS = {
-        'cm_distance': 0.30,
-        'range_fit': 0.20,
-        'segments': 0.20,
-        'largest_segment': 0.15,
-        'x_match': 0.05,
-        'age_match': 0.10
-    }
-    adjusted_cm = float(adjust_cm_for_endogamia(request.cm, request.endogamia, rel["code"]))
-    scores = {}
-    # 1. Distancia al promedio de cM
-    avg_cm = float(rel["promedio_cm"])
-    diferencia = abs(adjusted_cm - avg_cm) / avg_cm
-    if diferencia <= 0.15:
-        scores['cm_distance'] = 1.0
+    # Razón frente al límite que se sobrepasa (1 dentro del rango): una sola potencia por relación
+    ratio = np.where(value < min_seg, value / min_seg, np.where(value > max_seg, max_seg / value, 1.0))
+    scores = np.where(ratio > 0, np.power(ratio, 0.7), 0.0)
+    return np.where(has_range, scores, 0.5)
+
+# Las ramas descartadas por np.where pueden dividir por cero; el estado de errores se fija una vez por llamada
+@np.errstate(divide="ignore", invalid="ignore")
+def calculate_probabilities(request) -> np.ndarray:
+    """
+    Calcula la probabilidad ajustada de cada relación de RELS basada en múltiples factores
+    """
+    cm = float(request.cm)
+    # Ajustar los cM compartidos según el nivel de endogamia y tipo de relación
+    if request.endogamia_idx is not None:
+        adjusted_cm = cm / _ENDOGAMIA_DIVISORS[request.endogamia_idx]
     else:
-        val = 1 - diferencia
-        scores['cm_distance'] = math.sqrt(val) if val > 0 else 0.0
+        adjusted_cm = np.full(len(RELS), cm)
+    # 1. Distancia al promedio de cM
+    diferencia = np.abs(adjusted_cm - _PROMEDIO_CM) / _PROMEDIO_CM
+    cm_distance = np.where(diferencia <= 0.15, 1.0, np.sqrt(np.maximum(1 - diferencia, 0.0)))
     # 2. Qué tan dentro del rango está
-    min_cm = float(rel["min_cm"])
-    max_cm = float(rel["max_cm"])
-    if adjusted_cm < min_cm or adjusted_cm > max_cm:
-        scores['range_fit'] = 0.0
-    else:
-        range_center = (min_cm + max_cm) / 2
-        range_size = max_cm - min_cm
-        if range_size == 0:
-            scores['range_fit'] = 1.0
-        else:
-            val = 1 - pow(abs(adjusted_cm - range_center) / (range_size / 2), 0.7)
-            scores['range_fit'] = val if val > 0 else 0.0
+    val = 1 - np.power(np.abs(adjusted_cm - _CM_RANGE_CENTER) / _CM_HALF_RANGE, 0.7)
+    range_fit = np.where(
+        (adjusted_cm < _MIN_CM) | (adjusted_cm > _MAX_CM),
+        0.0,
+        np.where(_CM_RANGE_SIZE == 0, 1.0, np.where(val > 0, val, 0.0))
+    )
     # 3. Número de segmentos
     if request.segments is not None:
-        segment_ranges = {
-            "FS": (35, 45),
-            "1C": (25, 35),
-            "2C": (10, 20),
-            "3C": (3, 10),
-            "4C": (2, 5)
-        }
-        if rel["code"] in segment_ranges:
-            min_seg, max_seg = segment_ranges[rel["code"]]
-            if request.segments < min_seg:
-                val = request.segments / min_seg
-                scores['segments'] = pow(val, 0.7) if val > 0 else 0.0
-            elif request.segments > max_seg:
-                val = max_seg / request.segments
-                scores['segments'] = pow(val, 0.7) if val > 0 else 0.0
-            else:
-                scores['segments'] = 1.0
-        else:
-            scores['segments'] = 0.5
+        segments = _segment_scores(float(request.segments), _SEG_MIN, _SEG_MAX, _HAS_SEG)
     else:
-        scores['segments'] = 0.5
+        segments = 0.5
     # 4. Tamaño del segmento más grande
     if request.largest_segment is not None:
-        largest_segment_ranges = {
-            "FS": (150, 250),
-            "1C": (80, 150),
-            "2C": (50, 100),
-            "3C": (15, 60),
-            "4C": (10, 30)
-        }
-        if rel["code"] in largest_segment_ranges:
-            min_seg, max_seg = largest_segment_ranges[rel["code"]]
-            if request.largest_segment < min_seg:
-                val = request.largest_segment / min_seg
-                scores['largest_segment'] = pow(val, 0.7) if val > 0 else 0.0
-            elif request.largest_segment > max_seg:
-                val = max_seg / request.largest_segment
-                scores['largest_segment'] = pow(val, 0.7) if val > 0 else 0.0
-            else:
-                scores['largest_segment'] = 1.0
-        else:
-            scores['largest_segment'] = 0.5
+        largest_segment = _segment_scores(float(request.largest_segment), _LS_MIN, _LS_MAX, _HAS_LS)
     else:
-        scores['largest_segment'] = 0.5
+        largest_segment = 0.5
     # 5. Coincidencia en cromosoma X
     if request.x_inheritance is not None:
-        x_inheritance_patterns = {
-            "FS": True,
-            "1C": None,
-            "2C": None,
-            "3C": None,
-            "4C": None
-        }
-        expected_x = x_inheritance_patterns.get(rel["code"])
-        if expected_x is True and request.x_inheritance:
-            scores['x_match'] = 1.0
-        elif expected_x is False and not request.x_inheritance:
-            scores['x_match'] = 1.0
-        elif expected_x is None:
-            scores['x_match'] = 0.5
-        else:
-            scores['x_match'] = 0.0
+        x_value = request.x_inheritance
+        x_match = np.where(
+            (_X_EXPECTED_TRUE & x_value) | (_X_EXPECTED_FALSE & (not x_value)),
+            1.0,
+            np.where(_X_EXPECTED_NONE, 0.5, 0.0)
+        )
     else:
-        scores['x_match'] = 0.5
+        x_match = 0.5
     # 6. Coincidencia de edad
-    scores['age_match'] = float(calculate_age_probability(rel, request))
+    if request.person1_age is None or request.person2_age is None:
+        age_match = 0.5  # Valor neutral si no hay información de edad
+    else:
+        age_diff = abs(float(request.person1_age) - float(request.person2_age))
+        in_range = 1.0 - (np.abs(age_diff - _AGE_CENTER) / _AGE_HALF_RANGE)
+        age_match = np.where(
+            age_diff < _AGE_MIN,
+            np.maximum(0.0, 1.0 - (_AGE_MIN - age_diff) / 10.0),
+            np.where(age_diff > _AGE_MAX, np.maximum(0.0, 1.0 - (age_diff - _AGE_MAX) / 10.0), in_range)
+        )
+        age_match = np.where(_HAS_AGE, age_match, 0.5)
     # Calcular probabilidad final ponderada
-    final_score = sum(WEIGHTS[factor] * score for factor, score in scores.items())
+    w_cm_distance, w_range_fit, w_segments, w_largest_segment, w_x_match, w_age_match = _WEIGHT_VALUES
+    final_score = (
+        w_cm_distance * cm_distance
+        + w_range_fit * range_fit
+        + w_segments * segments
+        + w_largest_segment * largest_segment
+        + w_x_match * x_match
+        + w_age_match * age_match
+    )
     # Ajustar por generación si está disponible
-    if request.generacion is not None and rel.get("generacion") is not None:
-        generation_match = request.generacion == str(rel["generacion"])
-        final_score = final_score * (1.25 if generation_match else 0.75)
-    # Asegurar que el resultado es un float real entre 0 y 1
-    try:
-        final_score = float(final_score.real)
-    except Exception:
-        final_score = 0.0
-    return float(max(0, min(1, final_score)))
+    if request.generacion is not None:
+        generation_match = _GENERACION == request.generacion
+        final_score = np.where(
+            _HAS_GENERACION,
+            final_score * np.where(generation_match, 1.25, 0.75),
+            final_score
+        )
+    # Asegurar que el resultado está entre 0 y 1
+    return np.minimum(np.maximum(final_score, 0.0), 1.0)
 
 @app.get("/")
 def read_root():
-    return {"message": "API en funcionamiento - listo para integrar en el futuro."}
+    return Response(content=ROOT_JSON, media_type="application/json")
 
 @app.get("/api/relationships/")
-def get_relationships(cm: int):
+def get_relationships(cm: int, request: Request):
     """
     Devuelve todas las relaciones cuyo rango de cM cubra el valor recibido
     """
-    posibles = [r for r in RELS if r["min_cm"] <= cm <= r["max_cm"]]
-    return {"results": posibles}
+    return cached_json_response(request, *_relationships_bytes(cm))
 
 @app.get("/api/histogram/")
 def get_histogram(code: str):
     """
     Devuelve el histograma de distribución para la relación solicitada
     """
+    hist_json = HIST_JSON.get(code)
+    if hist_json is None:
+        raise HTTPException(status_code=404, detail="Relación no encontrada")
+    return Response(content=hist_json, media_type="application/json")
+
+# Campos del request de los que depende el análisis (sexo no interviene), en orden de clave de caché
+_ANALYSIS_FIELDS = ("cm", "segments", "largest_segment", "person1_age", "person2_age", "generacion", "x_inheritance", "endogamia")
+
+@lru_cache(maxsize=4096)
+def analysis_json(*values) -> bytes:
+    """
+    Devuelve el análisis ya serializado; las peticiones repetidas se sirven desde la caché
+    """
+    # Los valores ya fueron validados por pydantic al recibir la petición
+    request = AnalysisRequest.model_construct(**dict(zip(_ANALYSIS_FIELDS, values)))
+    # Calcular probabilidades para todas las relaciones a la vez
+    probs = calculate_probabilities(request)
+    # Solo incluir relaciones con probabilidad > 10%, ya ordenadas por probabilidad
+    candidates = np.flatnonzero(probs > 0.1)
+    candidates = candidates[np.argsort(-probs[candidates], kind="stable")]
+    results = []
+    for i, prob in zip(candidates.tolist(), probs[candidates].tolist()):
+        rel = RELS[i]
+        results.append({
+            "code": rel["code"],
+            "nombre": rel["nombre"],
+            "abreviado": rel["abreviado"],
+            "promedio_cm": float(rel["promedio_cm"]),
+            "min_cm": float(rel["min_cm"]),
+            "max_cm": float(rel["max_cm"]),
+            "adjustedProb": prob,
+            "xPlausible": None,  # Placeholder, update if logic exists
+            "agePlausible": None  # Placeholder, update if logic exists
+        })
+    
+    # Preparar el análisis detallado
+    most_likely = results[0] if results else None
+    second_likely = results[1] if len(results) > 1 else None
+    
+    # Generar análisis detallado
+    analysis = {
+        "summary": generate_relationship_summary(request, most_likely, second_likely),
+        "suggestions": generate_investigation_suggestions(request, most_likely),
+        "relationships": results
+    }
+    return orjson.dumps(analysis)
+
+def analysis_body(request: AnalysisRequest) -> bytes:
+    """
+    Devuelve el análisis serializado de un request validado, o un error 500 si falla
+    """
     try:
-        hist = HISTS.get(code)
-        if hist is None:
-            raise HTTPException(status_code=404, detail="Relación no encontrada")
-        
-        # Asegurarse de que los datos están en el formato correcto
-        formatted_hist = {}
-        if isinstance(hist, dict):
-            for bin_range, count in hist.items():
-                formatted_hist[bin_range] = int(count)
-        
-        return {"histogram": formatted_hist}
-    except HTTPException:
-        # Re-lanzar la excepción HTTP para mantener el código de estado 404
-        raise
+        return analysis_json(*(getattr(request, field) for field in _ANALYSIS_FIELDS))
     except Exception as e:
-        print(f"Error en get_histogram: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error al procesar el histograma: {str(e)}")
+        logger.error("Error en el análisis: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/v1/analyze")
 async def analyze_relationship(request: AnalysisRequest):
     """
     Analiza una relación basada en ADN compartido y otros factores
     """
-    try:
-        # Validar y convertir los datos de entrada
-        cm = float(request.cm)
-        segments = int(request.segments) if request.segments is not None else None
-        largest_segment = float(request.largest_segment) if request.largest_segment is not None else None
-        person1_age = int(request.person1_age) if request.person1_age is not None else None
-        person2_age = int(request.person2_age) if request.person2_age is not None else None
-        
-        # Crear una copia del request con los valores convertidos
-        processed_request = AnalysisRequest(
-            cm=cm,
-            segments=segments,
-            largest_segment=largest_segment,
-            person1_age=person1_age,
-            person2_age=person2_age,
-            generacion=request.generacion,
-            sexo=request.sexo,
-            x_inheritance=request.x_inheritance,
-            endogamia=request.endogamia
-        )
-        
-        # Calcular probabilidades para cada relación
-        results = []
-        for rel in RELS:
-            try:
-                prob = calculate_probability(rel, processed_request)
-                if prob > 0.1:  # Solo incluir relaciones con probabilidad > 10%
-                    results.append({
-                        "code": rel["code"],
-                        "nombre": rel["nombre"],
-                        "abreviado": rel["abreviado"],
-                        "promedio_cm": float(rel["promedio_cm"]),
-                        "min_cm": float(rel["min_cm"]),
-                        "max_cm": float(rel["max_cm"]),
-                        "adjustedProb": float(prob),
-                        "xPlausible": None,  # Placeholder, update if logic exists
-                        "agePlausible": None  # Placeholder, update if logic exists
-                    })
-            except Exception as e:
-                logger.error(f"Error al calcular probabilidad para {rel['code']}: {str(e)}")
-                continue
-        
-        # Ordenar por probabilidad
-        results.sort(key=lambda x: x["adjustedProb"], reverse=True)
-        
-        # Preparar el análisis detallado
-        most_likely = results[0] if results else None
-        second_likely = results[1] if len(results) > 1 else None
-        
-        # Generar análisis detallado
-        analysis = {
-            "summary": generate_relationship_summary(processed_request, most_likely, second_likely),
-            "suggestions": generate_investigation_suggestions(processed_request, most_likely),
-            "relationships": results
-        }
-        
-        return analysis
-    except Exception as e:
-        logger.error(f"Error en el análisis: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+    return Response(content=analysis_body(request), media_type="application/json")
+
+@app.post("/api/v1/analyze/batch")
+async def analyze_relationships_batch(batch: AnalysisBatchRequest):
+    """
+    Analiza varias relaciones en una sola petición; devuelve los análisis en el mismo orden
+    """
+    body = b"[" + b",".join(analysis_body(item) for item in batch.items) + b"]"
+    return Response(content=body, media_type="application/json")
+
+# Tipo de ancestro que nombra cada relación ("bisabuelo", "abuelo" o None), calculado una sola vez
+_NAME_KIND = MappingProxyType({
+    r["code"]: (
+        "bisabuelo" if "bisabuelo" in r["nombre"].lower()
+        else "abuelo" if "abuelo" in r["nombre"].lower()
+        else None
+    )
+    for r in RELS
+})
+
+# Sugerencias de investigación por código de la relación más probable
+_SUGGESTIONS_BY_CODE = MappingProxyType({
+    "2C": (  # Primos segundos
+        "Investigar a los bisabuelos y su descendencia",
+        "Explorar tíos abuelos y primos del padre/madre",
+        "Comparar árboles por líneas colaterales"
+    ),
+    "GGAU": (  # Tío/a bisabuelo/a
+        "Investigar la línea de los bisabuelos",
+        "Buscar registros de hermanos de los bisabuelos",
+        "Explorar registros históricos de la época"
+    ),
+    "1C1R": (  # Primo hermano una vez removido
+        "Investigar la línea de los primos hermanos",
+        "Explorar registros de hijos de primos hermanos",
+        "Comparar árboles por ramas colaterales"
+    ),
+})
 
 def generate_relationship_summary(request, most_likely, second_likely):
     """
@@ -439,9 +634,10 @@ def generate_relationship_summary(request, most_likely, second_likely):
         # Explicar por qué la segunda opción es menos probable
         if request.person1_age and request.person2_age:
             age_diff = abs(request.person1_age - request.person2_age)
-            if "bisabuelo" in second_likely['nombre'].lower() and age_diff < 40:
+            kind = _NAME_KIND[second_likely["code"]]
+            if kind == "bisabuelo" and age_diff < 40:
                 summary.append("Esta relación es menos probable debido a la diferencia de edad relativamente pequeña para ser bisabuelo/a.")
-            elif "abuelo" in second_likely['nombre'].lower() and age_diff < 20:
+            elif kind == "abuelo" and age_diff < 20:
                 summary.append("Esta relación es menos probable debido a la diferencia de edad relativamente pequeña para ser abuelo/a.")
     
     return " ".join(summary)
@@ -453,27 +649,8 @@ def generate_investigation_suggestions(request, most_likely):
     if not most_likely:
         return []
     
-    suggestions = []
-    
     # Sugerencias basadas en la relación más probable
-    if most_likely["code"] == "2C":  # Primos segundos
-        suggestions.extend([
-            "Investigar a los bisabuelos y su descendencia",
-            "Explorar tíos abuelos y primos del padre/madre",
-            "Comparar árboles por líneas colaterales"
-        ])
-    elif most_likely["code"] == "GGAU":  # Tío/a bisabuelo/a
-        suggestions.extend([
-            "Investigar la línea de los bisabuelos",
-            "Buscar registros de hermanos de los bisabuelos",
-            "Explorar registros históricos de la época"
-        ])
-    elif most_likely["code"] == "1C1R":  # Primo hermano una vez removido
-        suggestions.extend([
-            "Investigar la línea de los primos hermanos",
-            "Explorar registros de hijos de primos hermanos",
-            "Comparar árboles por ramas colaterales"
-        ])
+    suggestions = list(_SUGGESTIONS_BY_CODE.get(most_likely["code"], ()))
     
     # Sugerencias basadas en el cromosoma X
     if request.x_inheritance:
@@ -487,46 +664,42 @@ def generate_investigation_suggestions(request, most_likely):
     
     return suggestions
 
-@app.get("/api/endogamia/ayuda")
-async def get_endogamia_help():
-    """
-    Devuelve información de ayuda sobre endogamia y referencias
-    """
-    return {
-        "niveles": {
-            level: {
-                "nombre": level.capitalize(),
-                "descripcion": f"Descripción para el nivel {level}.",
-                "ejemplos": f"Ejemplos para el nivel {level}.",
-                "efecto_adn": f"Efecto en ADN para el nivel {level}."
-            }
-            for level in ["none", "light", "moderate", "high", "very_high"]
+# Ayuda de endogamia: contenido estático, se construye una sola vez al cargar el módulo
+_ENDOGAMIA_HELP = {
+    "niveles": {
+        level: {
+            "nombre": level.capitalize(),
+            "descripcion": f"Descripción para el nivel {level}.",
+            "ejemplos": f"Ejemplos para el nivel {level}.",
+            "efecto_adn": f"Efecto en ADN para el nivel {level}."
+        }
+        for level in ["none", "light", "moderate", "high", "very_high"]
+    },
+    "referencias": [
+        {
+            "titulo": "Endogamia y ADN: Guía para genealogistas",
+            "autor": "Blaine Bettinger",
+            "fuente": "The Genetic Genealogist",
+            "url": "https://thegeneticgenealogist.com/",
+            "descripcion": "Artículo sobre cómo la endogamia afecta la interpretación del ADN compartido."
+        },
+        {
+            "titulo": "Endogamia en poblaciones judías",
+            "autor": "Harry Ostrer",
+            "fuente": "Genetic Studies of Jewish Populations",
+            "descripcion": "Estudio sobre los efectos de la endogamia en poblaciones judías y su impacto en el ADN compartido."
         },
-        "referencias": [
-            {
-                "titulo": "Endogamia y ADN: Guía para genealogistas",
-                "autor": "Blaine Bettinger",
-                "fuente": "The Genetic Genealogist",
-                "url": "https://thegeneticgenealogist.com/",
-                "descripcion": "Artículo sobre cómo la endogamia afecta la interpretación del ADN compartido."
-            },
-            {
-                "titulo": "Endogamia en poblaciones judías",
-                "autor": "Harry Ostrer",
-                "fuente": "Genetic Studies of Jewish Populations",
-                "descripcion": "Estudio sobre los efectos de la endogamia en poblaciones judías y su impacto en el ADN compartido."
-            },
-            {
-                "titulo": "Endogamia y genealogía genética",
-                "autor": "Roberto Hernández",
-                "fuente": "Genealogía Genética en Español",
-                "url": "https://genealogiagenetica.es/",
-                "descripcion": "Guía en español sobre cómo interpretar el ADN compartido en casos de endogamia."
-            }
-        ],
-        "explicacion_general": {
-            "titulo": "¿Qué es la endogamia y cómo afecta al ADN compartido?",
-            "contenido": """
+        {
+            "titulo": "Endogamia y genealogía genética",
+            "autor": "Roberto Hernández",
+            "fuente": "Genealogía Genética en Español",
+            "url": "https://genealogiagenetica.es/",
+            "descripcion": "Guía en español sobre cómo interpretar el ADN compartido en casos de endogamia."
+        }
+    ],
+    "explicacion_general": {
+        "titulo": "¿Qué es la endogamia y cómo afecta al ADN compartido?",
+        "contenido": """
             La endogamia ocurre cuando hay matrimonios entre parientes en una familia. Esto puede afectar 
             significativamente la cantidad de ADN compartido entre dos personas, haciendo que compartan 
             más ADN del que normalmente se esperaría para su relación.
@@ -539,8 +712,18 @@ async def get_endogamia_help():
             Esta herramienta te permite ajustar los cM compartidos según el nivel de endogamia en tu familia, 
             lo que ayuda a obtener una interpretación más precisa de las relaciones.
             """
-        }
     }
+}
+
+_ENDOGAMIA_HELP_JSON = orjson.dumps(_ENDOGAMIA_HELP)
+_ENDOGAMIA_HELP_ETAG = make_etag(_ENDOGAMIA_HELP_JSON)
+
+@app.get("/api/endogamia/ayuda")
+async def get_endogamia_help(request: Request):
+    """
+    Devuelve información de ayuda sobre endogamia y referencias
+    """
+    return cached_json_response(request, _ENDOGAMIA_HELP_JSON, _ENDOGAMIA_HELP_ETAG)
 
 # Endpoints de documentación personalizados
 @app.get("/docs", include_in_schema=False)
@@ -554,12 +737,17 @@ async def custom_swagger_ui_html():
 
 @app.get("/openapi.json", include_in_schema=False)
 async def get_openapi_endpoint():
-    return get_openapi(
-        title=app.title,
-        version=app.version,
-        description=app.description,
-        routes=app.routes,
-    )
+    return Response(content=_OPENAPI_JSON, media_type="application/json")
+
+# Esquema OpenAPI generado y serializado una sola vez, con todas las rutas ya registradas
+_OPENAPI_SCHEMA = get_openapi(
+    title=app.title,
+    version=app.version,
+    description=app.description,
+    routes=app.routes,
+)
+_OPENAPI_JSON = orjson.dumps(_OPENAPI_SCHEMA)
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -0,0 +1,130 @@
+import pytest
+import httpx
+import orjson
+from collections import OrderedDict
+from fastapi.testclient import TestClient
+from main import app, reset_rate_limits
+
+RESPONSE_CACHE_SIZE = 256
+
+def rj(response):
+    """
+    Decodifica el cuerpo JSON de una respuesta con orjson
+    """
+    return orjson.loads(response.content)
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--use-response-cache",
+        action="store_true",
+        default=False,
+        help="Reutiliza las respuestas de GET idénticos dentro de la sesión de test",
+    )
+
+# Las peticiones condicionales dependen del estado del cliente, nunca se sirven desde la caché
+CONDITIONAL_HEADERS = ("if-none-match", "if-modified-since", "if-match", "if-unmodified-since")
+
+class CachedTestClient(TestClient):
+    """
+    TestClient que reutiliza las respuestas de GET idénticos (misma url y headers) sin pasar por la app;
+    use_cache permite desactivarla, por ejemplo en los tests serial
+    """
+    def __init__(self, app, maxsize=RESPONSE_CACHE_SIZE, **kwargs):
+        super().__init__(app, **kwargs)
+        self.maxsize = maxsize
+        self.cache = OrderedDict()
+        self.use_cache = True
+
+    def send(self, request, **kwargs):
+        if (
+            not self.use_cache
+            or request.method != "GET"
+            or kwargs.get("stream")
+            or any(header in request.headers for header in CONDITIONAL_HEADERS)
+        ):
+            return super().send(request, **kwargs)
+        key = (str(request.url), tuple(request.headers.raw))
+        response = self.cache.get(key)
+        if response is None:
+            response = super().send(request, **kwargs)
+            self.cache[key] = response
+            if len(self.cache) > self.maxsize:
+                self.cache.popitem(last=False)
+        else:
+            self.cache.move_to_end(key)
+        return response
+
+@pytest.fixture(scope="session")
+def client(request):
+    """
+    Cliente de test compartido por toda la sesión; startup y shutdown se ejecutan una sola vez
+    """
+    client_class = CachedTestClient if request.config.getoption("--use-response-cache") else TestClient
+    with client_class(app) as c:
+        yield c
+
+@pytest.fixture(autouse=True)
+def serial_without_cache(request, client):
+    """
+    Los tests serial (rate limit, estado compartido) siempre llegan a la app, nunca a la caché de respuestas
+    """
+    if not isinstance(client, CachedTestClient) or request.node.get_closest_marker("serial") is None:
+        yield
+        return
+    client.use_cache = False
+    yield
+    client.use_cache = True
+
+@pytest.fixture(scope="session", autouse=True)
+def warmup(client):
+    """
+    Primera petición de la sesión, para que ningún test cargue con la inicialización de la app
+    """
+    client.get("/")
+    reset_rate_limits()
+
+@pytest.fixture
+def clean_rate_limits():
+    """
+    Empieza y termina el test sin buckets de rate limit
+    """
+    reset_rate_limits()
+    yield
+    reset_rate_limits()
+
+@pytest.fixture
+async def aclient():
+    """
+    Cliente asíncrono en proceso para lanzar peticiones independientes en paralelo con asyncio.gather;
+    se identifica como "testclient" para quedar fuera del rate limiting, igual que el cliente síncrono
+    """
+    transport = httpx.ASGITransport(app=app, client=("testclient", 50000))
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as ac:
+        yield ac
+
+@pytest.fixture(scope="session")
+def base_relationships(client):
+    """
+    Relaciones para 1500 cM, pedidas y parseadas una sola vez por sesión
+    """
+    response = client.get("/api/relationships/?cm=1500")
+    assert response.status_code == 200, "El endpoint debería devolver código 200"
+    return rj(response)
+
+@pytest.fixture(scope="session")
+def sample_code(base_relationships):
+    """
+    Código de una relación válida (la primera para 1500 cM)
+    """
+    results = base_relationships["results"]
+    assert len(results) > 0, "No se encontraron relaciones para probar"
+    return results[0]["code"]
+
+@pytest.fixture(scope="session")
+def openapi_schema(client):
+    """
+    Esquema OpenAPI parseado una sola vez por sesión
+    """
+    response = client.get("/openapi.json")
+    assert response.status_code == 200, "El esquema OpenAPI debe estar disponible"
+    return rj(response)
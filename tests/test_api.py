@@ -1,16 +1,26 @@
 import pytest
-import requests
+import asyncio
+import httpx
 import json
-from fastapi.testclient import TestClient
-from main import app, request_counts
-from app.config import settings
+import numpy as np
+from operator import itemgetter
+from main import app, RATE_LIMIT_PER_MINUTE
+from conftest import rj
 
-BASE_URL = "http://localhost:8001"
-
-client = TestClient(app)
+# Campos obligatorios de cada relación devuelta por /api/relationships y /api/v1/analyze
+RELATIONSHIP_FIELDS = frozenset({"code", "nombre", "abreviado", "promedio_cm", "min_cm", "max_cm"})
+ANALYSIS_FIELDS = RELATIONSHIP_FIELDS | {"adjustedProb", "xPlausible", "agePlausible"}
+OPENAPI_FIELDS = frozenset({"openapi", "info", "paths", "components"})
+# Headers de seguridad esperados (httpx normaliza los nombres a minúsculas)
+SECURITY_HEADERS = {
+    "x-content-type-options": "nosniff",
+    "x-frame-options": "DENY",
+    "x-xss-protection": "1; mode=block"
+}
+REQUIRED_SECURITY_HEADERS = frozenset({"content-security-policy", "strict-transport-security"})
 
 @pytest.mark.relationships
-def test_get_relationships():
+def test_get_relationships(base_relationships):
     """
     Verifica que el endpoint GET /api/relationships devuelve:
     - Un código 200
@@ -18,25 +28,48 @@ def test_get_relationships():
     - Cada relación tiene todos los campos requeridos
     - Los datos son consistentes y válidos
     """
-    response = client.get("/api/relationships/?cm=1500")
-    assert response.status_code == 200, "El endpoint debería devolver código 200"
-    data = response.json()
+    data = base_relationships
     assert "results" in data, "La respuesta debe contener la clave 'results'"
     assert isinstance(data["results"], list), "Los resultados deben ser una lista"
     assert len(data["results"]) > 0, "La lista de resultados no debe estar vacía"
     
     # Verificar que los resultados tienen la estructura correcta
-    required_fields = ["code", "nombre", "abreviado", "promedio_cm", "min_cm", "max_cm"]
     for relationship in data["results"]:
-        for field in required_fields:
-            assert field in relationship, f"Falta el campo requerido '{field}' en la relación"
+        missing = RELATIONSHIP_FIELDS.difference(relationship)
+        assert not missing, f"Faltan campos requeridos en la relación: {missing}"
         
         # Verificar que los valores son válidos
         assert relationship["min_cm"] <= relationship["promedio_cm"] <= relationship["max_cm"], \
             f"Los valores de cM no son consistentes para la relación {relationship['code']}"
 
+@pytest.mark.relationships
+def test_relationships_conditional_get(client):
+    """
+    Verifica las peticiones condicionales con If-None-Match:
+    - El ETag es débil (GZip puede cambiar la codificación del mismo contenido)
+    - Un tag coincidente, con o sin W/, "*" o una lista que lo contenga devuelven 304 sin cuerpo
+    - Un tag distinto devuelve 200 con el cuerpo completo
+    """
+    url = "/api/relationships/?cm=1500"
+    response = client.get(url)
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert etag.startswith('W/"'), f"El ETag debería ser débil, encontrado: {etag}"
+    strong = etag[2:]
+    
+    for if_none_match in (etag, strong, "*", f'"otro", {etag}', f'W/"otro", {strong}'):
+        conditional = client.get(url, headers={"If-None-Match": if_none_match})
+        assert conditional.status_code == 304, f"If-None-Match {if_none_match!r} debería devolver 304"
+        assert conditional.content == b""
+        assert conditional.headers["etag"] == etag
+    
+    for if_none_match in ('"otro"', 'W/"otro"', '"otro", W/"distinto"'):
+        unmatched = client.get(url, headers={"If-None-Match": if_none_match})
+        assert unmatched.status_code == 200, f"If-None-Match {if_none_match!r} no debería coincidir"
+        assert unmatched.content == response.content
+
 @pytest.mark.analysis
-def test_calculate_relationships():
+async def test_calculate_relationships(aclient):
     """
     Verifica el endpoint POST /api/v1/analyze con diferentes casos:
     - Caso completo con todos los parámetros
@@ -52,60 +85,56 @@ def test_calculate_relationships():
         "segments": 25,
         "largest_segment": 100.5
     }
-    response = client.post("/api/v1/analyze", json=payload)
+    
+    # Caso 3: Datos inválidos
+    invalid_payloads = [
+        ({"cm": -100}, "Los cM negativos deberían ser rechazados"),
+        ({"cm": 0}, "Los cM igual a 0 deberían ser rechazados"),
+        ({"cm": 7000}, "Los cM mayores a 4000 deberían ser rechazados"),
+        ({}, "La falta de cM debería ser rechazada")
+    ]
+    
+    # Las peticiones son independientes, se envían todas a la vez
+    response, basic_response, *invalid_responses = await asyncio.gather(
+        aclient.post("/api/v1/analyze", json=payload),
+        aclient.post("/api/v1/analyze", json={"cm": 1500}),
+        *[aclient.post("/api/v1/analyze", json=p) for p, _ in invalid_payloads],
+    )
+    
     assert response.status_code == 200, "El análisis completo debería ser exitoso"
-    data = response.json()
+    data = rj(response)
     assert isinstance(data, dict), "La respuesta debe ser un diccionario"
     assert "relationships" in data, "La respuesta debe contener la clave 'relationships'"
     assert isinstance(data["relationships"], list), "Las relaciones deben ser una lista"
     assert len(data["relationships"]) > 0, "Deberían existir relaciones posibles"
     
     # Verificar estructura y validez de los resultados
-    required_fields = [
-        "code", "nombre", "abreviado", "promedio_cm", "min_cm", "max_cm",
-        "adjustedProb", "xPlausible", "agePlausible"
-    ]
     for relationship in data["relationships"]:
-        for field in required_fields:
-            assert field in relationship, f"Falta el campo '{field}' en el resultado"
+        missing = ANALYSIS_FIELDS.difference(relationship)
+        assert not missing, f"Faltan campos en el resultado: {missing}"
         assert 0 <= relationship["adjustedProb"] <= 1, \
             f"La probabilidad debe estar entre 0 y 1, encontrado: {relationship['adjustedProb']}"
     
     # Caso 2: Solo centimorgans
-    response = client.post("/api/v1/analyze", json={"cm": 1500})
-    assert response.status_code == 200, "El análisis básico debería ser exitoso"
+    assert basic_response.status_code == 200, "El análisis básico debería ser exitoso"
     
     # Caso 3: Datos inválidos
-    invalid_payloads = [
-        ({"cm": -100}, "Los cM negativos deberían ser rechazados"),
-        ({"cm": 0}, "Los cM igual a 0 deberían ser rechazados"),
-        ({"cm": 7000}, "Los cM mayores a 4000 deberían ser rechazados"),
-        ({}, "La falta de cM debería ser rechazada")
-    ]
-    
-    for payload, message in invalid_payloads:
-        response = client.post("/api/v1/analyze", json=payload)
-        assert response.status_code == 422, message
+    for (_, message), invalid_response in zip(invalid_payloads, invalid_responses):
+        assert invalid_response.status_code == 422, message
 
 @pytest.mark.histogram
-def test_get_histogram():
+def test_get_histogram(client, sample_code):
     """
     Verifica que el endpoint GET /api/histogram:
     - Devuelve datos válidos para códigos de relación existentes
     - Maneja correctamente códigos inexistentes
     - Los datos del histograma son consistentes
     """
-    # Obtener un código válido
-    response = client.get("/api/relationships/?cm=1500")
-    assert response.status_code == 200
-    data = response.json()
-    assert len(data["results"]) > 0, "No se encontraron relaciones para probar"
-    code = data["results"][0]["code"]
-    
     # Probar histograma con código válido
+    code = sample_code
     response = client.get(f"/api/histogram/?code={code}")
     assert response.status_code == 200, f"El histograma para el código {code} debería existir"
-    data = response.json()
+    data = rj(response)
     assert "histogram" in data, "La respuesta debe contener la clave 'histogram'"
     assert isinstance(data["histogram"], dict), "El histograma debe ser un diccionario"
     
@@ -120,7 +149,7 @@ def test_get_histogram():
     assert response.status_code == 404, "Códigos inválidos deberían devolver 404"
 
 @pytest.mark.api
-def test_read_root():
+def test_read_root(client):
     """
     Verifica que el endpoint raíz:
     - Devuelve un código 200
@@ -128,38 +157,41 @@ def test_read_root():
     """
     response = client.get("/")
     assert response.status_code == 200, "El endpoint raíz debe estar disponible"
-    data = response.json()
+    data = rj(response)
     assert "message" in data, "La respuesta debe contener un mensaje"
     assert isinstance(data["message"], str), "El mensaje debe ser una cadena de texto"
 
-@pytest.mark.skip(reason="El cliente de test está excluido del rate limiting en el middleware, por lo que esta prueba no es válida en el entorno de test.")
 @pytest.mark.security
+@pytest.mark.serial
+@pytest.mark.usefixtures("clean_rate_limits")
 def test_rate_limiting():
     """
     Verifica que el rate limiting:
     - Permite el número correcto de peticiones por minuto
     - Bloquea peticiones excesivas
     - Devuelve el código y mensaje apropiados
+    
+    El cliente de test está excluido del rate limiting, así que la ráfaga se envía en proceso
+    y en paralelo desde una IP de cliente normal.
     """
-    # Resetear el estado del rate limiting antes de la prueba
-    request_counts.clear()
-    # Realizar peticiones hasta el límite
-    responses = []
-    for _ in range(settings.RATE_LIMIT_PER_MINUTE):
-        response = client.get("/api/v1/relationships")
-        responses.append(response.status_code)
-    # Verificar que todas las peticiones fueron exitosas
-    assert all(code == 200 for code in responses), \
+    async def burst():
+        transport = httpx.ASGITransport(app=app, client=("203.0.113.7", 12345))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+            return await asyncio.gather(*[ac.get("/") for _ in range(RATE_LIMIT_PER_MINUTE + 1)])
+    
+    responses = asyncio.run(burst())
+    codes = [response.status_code for response in responses]
+    # Todas las peticiones dentro del límite deberían ser exitosas y solo la excedente rechazada
+    assert codes.count(200) == RATE_LIMIT_PER_MINUTE, \
         "Todas las peticiones dentro del límite deberían ser exitosas"
-    # Intentar una petición adicional
-    response = client.get("/api/v1/relationships")
-    assert response.status_code == 429, \
+    assert codes.count(429) == 1, \
         "La petición que excede el límite debería ser rechazada"
-    assert "error" in response.json(), \
+    rejected = next(response for response in responses if response.status_code == 429)
+    assert "error" in rj(rejected), \
         "La respuesta de error debería incluir un mensaje"
 
 @pytest.mark.security
-def test_security_headers():
+def test_security_headers(client):
     """
     Verifica que los headers de seguridad:
     - Están presentes en la respuesta
@@ -167,55 +199,60 @@ def test_security_headers():
     - Incluyen todas las protecciones necesarias
     """
     response = client.get("/")
-    headers = response.headers
-    
-    security_headers = {
-        "X-Content-Type-Options": "nosniff",
-        "X-Frame-Options": "DENY",
-        "X-XSS-Protection": "1; mode=block"
-    }
+    headers = dict(response.headers)
     
-    for header, expected_value in security_headers.items():
-        assert header in headers, f"Falta el header de seguridad: {header}"
-        assert headers[header] == expected_value, \
-            f"Valor incorrecto para {header}: esperado {expected_value}, encontrado {headers[header]}"
-    
-    assert "Content-Security-Policy" in headers, \
-        "Debe incluir Content-Security-Policy"
-    assert "Strict-Transport-Security" in headers, \
-        "Debe incluir Strict-Transport-Security"
+    assert SECURITY_HEADERS.items() <= headers.items(), \
+        f"Headers de seguridad ausentes o incorrectos: {dict(SECURITY_HEADERS.items() - headers.items())}"
+    assert REQUIRED_SECURITY_HEADERS <= headers.keys(), \
+        "Debe incluir Content-Security-Policy y Strict-Transport-Security"
+
+@pytest.mark.security
+def test_security_headers_on_preflight(client):
+    """
+    Verifica que las respuestas generadas por CORS (preflight OPTIONS), que no llegan a la app,
+    también incluyen los headers de seguridad.
+    """
+    response = client.options("/api/v1/analyze", headers={
+        "Origin": "http://localhost:3000",
+        "Access-Control-Request-Method": "POST",
+    })
+    assert response.status_code == 200, "El preflight de un origen permitido debería ser aceptado"
+    assert "access-control-allow-origin" in response.headers, "Debe ser una respuesta de CORS"
+    headers = dict(response.headers)
+    assert SECURITY_HEADERS.items() <= headers.items(), \
+        f"Headers de seguridad ausentes o incorrectos: {dict(SECURITY_HEADERS.items() - headers.items())}"
+    assert REQUIRED_SECURITY_HEADERS <= headers.keys(), \
+        "Debe incluir Content-Security-Policy y Strict-Transport-Security"
 
 @pytest.mark.documentation
-def test_api_documentation():
+@pytest.mark.smoke
+def test_api_documentation(client):
     """
     Verifica que la documentación de la API:
     - Es accesible
     - Contiene la interfaz Swagger
     - Está correctamente formateada
     """
-    response = client.get("/docs")
-    assert response.status_code == 200, "La documentación debe estar disponible"
-    assert "swagger-ui" in response.text, \
+    # El CSS de Swagger se referencia en el <head>, basta con leer el primer fragmento
+    with client.stream("GET", "/docs") as response:
+        assert response.status_code == 200, "La documentación debe estar disponible"
+        prefix = next(response.iter_text())
+    assert "swagger-ui" in prefix, \
         "La documentación debe incluir la interfaz Swagger"
 
 @pytest.mark.documentation
-def test_openapi_schema():
+@pytest.mark.smoke
+def test_openapi_schema(openapi_schema):
     """
     Verifica que el esquema OpenAPI:
     - Es accesible
     - Tiene la estructura correcta
     - Incluye todos los componentes necesarios
     """
-    response = client.get("/openapi.json")
-    assert response.status_code == 200, "El esquema OpenAPI debe estar disponible"
-    schema = response.json()
-    
-    required_fields = ["openapi", "info", "paths", "components"]
-    for field in required_fields:
-        assert field in schema, \
-            f"El esquema debe incluir el campo: {field}"
+    missing = OPENAPI_FIELDS.difference(openapi_schema)
+    assert not missing, f"El esquema debe incluir los campos: {sorted(missing)}"
 
-@pytest.mark.parametrize("caso,payload,expected_relationship", [
+REAL_CASES = (
     (
         "Bettina y Mariana - Primas segundas",
         {
@@ -263,9 +300,64 @@ def test_openapi_schema():
             "largest_segment": 24.5
         },
         "3C"
+    ),
+    (
+        "Primas terceras con herencia del cromosoma X",
+        {
+            "cm": 65.8,
+            "generacion": "3",
+            "sexo": "F",
+            "x_inheritance": True,
+            "segments": 5,
+            "largest_segment": 24.5
+        },
+        "3C"
+    ),
+    (
+        "Medias hermanas con herencia paterna del cromosoma X",
+        {
+            "cm": 1800,
+            "generacion": "0",
+            "sexo": "F",
+            "x_inheritance": True,
+            "segments": 35,
+            "largest_segment": 150.2
+        },
+        "HS"
     )
-])
-def test_real_cases(caso, payload, expected_relationship):
+)
+
+# Rangos orientativos de segmentos y segmento mayor por relación (solo generan avisos)
+SEGMENT_RANGES = {
+    "FS": (35, 45),
+    "1C": (25, 35),
+    "2C": (10, 20),
+    "3C": (3, 10),
+    "4C": (2, 5)
+}
+LARGEST_SEGMENT_RANGES = {
+    "FS": (150, 250),
+    "1C": (80, 150),
+    "2C": (50, 100),
+    "3C": (15, 60),
+    "4C": (10, 30)
+}
+
+# Cuerpo del batch serializado una sola vez al importar el módulo
+REAL_CASES_BATCH = json.dumps({"items": [payload for _, payload, _ in REAL_CASES]})
+JSON_HEADERS = {"content-type": "application/json"}
+
+@pytest.fixture(scope="module")
+def real_case_results(client):
+    """
+    Analiza todos los casos reales con una sola petición al endpoint batch
+    """
+    response = client.post("/api/v1/analyze/batch", content=REAL_CASES_BATCH, headers=JSON_HEADERS)
+    assert response.status_code == 200, "El análisis batch de los casos reales debería ser exitoso"
+    return dict(zip((caso for caso, _, _ in REAL_CASES), rj(response)))
+
+@pytest.mark.parametrize("caso,payload,expected_relationship", REAL_CASES)
+def test_real_cases(real_case_results, caso, payload, expected_relationship):
     """
     Verifica casos reales de relaciones:
     - La predicción coincide con la relación conocida
@@ -277,18 +369,15 @@ def test_real_cases(caso, payload, expected_relationship):
     - payload: Datos de la relación
     - expected_relationship: Código de relación esperado
     """
-    response = client.post("/api/v1/analyze", json=payload)
-    assert response.status_code == 200, f"El análisis para {caso} debería ser exitoso"
-    data = response.json()
+    data = real_case_results[caso]
     
     assert isinstance(data, dict), "Los resultados deben ser un diccionario"
     assert "relationships" in data, "La respuesta debe contener la clave 'relationships'"
     assert isinstance(data["relationships"], list), "Las relaciones deben ser una lista"
     assert len(data["relationships"]) > 0, f"No se encontraron resultados para {caso}"
     
-    # Ordenar por probabilidad ajustada
-    sorted_results = sorted(data["relationships"], key=lambda x: x["adjustedProb"], reverse=True)
-    most_probable = sorted_results[0]
+    # Relación con mayor probabilidad ajustada
+    most_probable = max(data["relationships"], key=itemgetter("adjustedProb"))
     
     # Verificar que la relación más probable es la esperada
     assert most_probable["code"] == expected_relationship, \
@@ -298,47 +387,57 @@ def test_real_cases(caso, payload, expected_relationship):
     assert most_probable["adjustedProb"] >= 0.15, \
         f"Para {caso}, la probabilidad de {expected_relationship} es muy baja: {most_probable['adjustedProb']}"
     
-    # Verificar consistencia de los resultados
-    for result in sorted_results:
-        assert 0 <= result["adjustedProb"] <= 1, \
-            f"Probabilidad inválida en {caso}: {result['adjustedProb']}"
-        if not (result["min_cm"] <= payload["cm"] <= result["max_cm"]):
-            print(f"WARNING: Los cM están fuera del rango para {result['code']} en {caso}: {payload['cm']} no está entre {result['min_cm']} y {result['max_cm']}")
+    # Verificar consistencia de los resultados, vectorizada sobre todas las relaciones
+    relationships = data["relationships"]
+    probs = np.fromiter((r["adjustedProb"] for r in relationships), dtype=np.float64, count=len(relationships))
+    invalid = (probs < 0) | (probs > 1)
+    assert not invalid.any(), f"Probabilidades inválidas en {caso}: {probs[invalid].tolist()}"
+    mins = np.fromiter((r["min_cm"] for r in relationships), dtype=np.float64, count=len(relationships))
+    maxs = np.fromiter((r["max_cm"] for r in relationships), dtype=np.float64, count=len(relationships))
+    for i in np.flatnonzero((payload["cm"] < mins) | (payload["cm"] > maxs)).tolist():
+        result = relationships[i]
+        print(f"WARNING: Los cM están fuera del rango para {result['code']} en {caso}: {payload['cm']} no está entre {result['min_cm']} y {result['max_cm']}")
+    for result in relationships:
         # Chequear segmentos si están presentes
-        segment_ranges = {
-            "FS": (35, 45),
-            "1C": (25, 35),
-            "2C": (10, 20),
-            "3C": (3, 10),
-            "4C": (2, 5)
-        }
-        if payload.get("segments") is not None and result["code"] in segment_ranges:
-            min_seg, max_seg = segment_ranges[result["code"]]
+        if payload.get("segments") is not None and result["code"] in SEGMENT_RANGES:
+            min_seg, max_seg = SEGMENT_RANGES[result["code"]]
             if not (min_seg <= payload["segments"] <= max_seg):
                 print(f"WARNING: Segmentos fuera de rango para {result['code']} en {caso}: {payload['segments']} no está entre {min_seg} y {max_seg}")
         # Chequear largest_segment si está presente
-        largest_segment_ranges = {
-            "FS": (150, 250),
-            "1C": (80, 150),
-            "2C": (50, 100),
-            "3C": (15, 60),
-            "4C": (10, 30)
-        }
-        if payload.get("largest_segment") is not None and result["code"] in largest_segment_ranges:
-            min_l, max_l = largest_segment_ranges[result["code"]]
+        if payload.get("largest_segment") is not None and result["code"] in LARGEST_SEGMENT_RANGES:
+            min_l, max_l = LARGEST_SEGMENT_RANGES[result["code"]]
             if not (min_l <= payload["largest_segment"] <= max_l):
                 print(f"WARNING: Largest segment fuera de rango para {result['code']} en {caso}: {payload['largest_segment']} no está entre {min_l} y {max_l}")
 
-@pytest.mark.parametrize("payload,expected_status", [
+async def test_analyze_batch(aclient):
+    """
+    Verifica que el endpoint batch devuelve, en orden, lo mismo que el análisis individual
+    y que rechaza el lote completo si algún elemento es inválido.
+    """
+    payloads = [{"cm": 1500}, {"cm": 65.8, "segments": 5, "largest_segment": 24.5}]
+    response, *singles, mixed, empty = await asyncio.gather(
+        aclient.post("/api/v1/analyze/batch", json={"items": payloads}),
+        *[aclient.post("/api/v1/analyze", json=p) for p in payloads],
+        aclient.post("/api/v1/analyze/batch", json={"items": [{"cm": 1500}, {"cm": -100}]}),
+        aclient.post("/api/v1/analyze/batch", json={"items": []}),
+    )
+    assert response.status_code == 200
+    assert rj(response) == [rj(single) for single in singles]
+    assert mixed.status_code == 422
+    assert empty.status_code == 422
+
+ANALYZE_CASES = (
     ({"cm": 1500}, 200),
     ({"cm": 1500, "generacion": "1", "sexo": "M", "x_inheritance": True}, 200),
     ({"cm": 1500, "generacion": None, "sexo": None, "x_inheritance": None}, 200),
     ({"cm": -100}, 422),
     ({"cm": 0}, 422),
     ({"cm": 7000}, 422),
-    ({}, 422)
-])
-def test_analyze_relationship(payload, expected_status):
+    ({}, 422),
+)
+
+@pytest.mark.parametrize("payload,expected_status", ANALYZE_CASES)
+def test_analyze_relationship(client, payload, expected_status):
     """
     Verifica diferentes escenarios de análisis de relaciones:
     - Casos válidos con diferentes combinaciones de parámetros
@@ -354,119 +453,39 @@ def test_analyze_relationship(payload, expected_status):
         f"Estado incorrecto para payload {payload}"
     
     if expected_status == 200:
-        data = response.json()
+        data = rj(response)
         assert isinstance(data, dict), "Los resultados deben ser un diccionario"
         assert "relationships" in data, "La respuesta debe contener la clave 'relationships'"
         assert isinstance(data["relationships"], list), "Las relaciones deben ser una lista"
         assert len(data["relationships"]) > 0, "No se encontraron resultados"
         # Verificar estructura y validez de los resultados
-        required_fields = [
-            "code", "nombre", "abreviado", "promedio_cm", "min_cm", "max_cm", "adjustedProb"
-        ]
         for relationship in data["relationships"]:
-            for field in required_fields:
-                assert field in relationship, \
-                    f"Falta el campo '{field}' en el resultado"
+            missing = ANALYSIS_FIELDS.difference(relationship)
+            assert not missing, f"Faltan campos en el resultado: {missing}"
             # Verificar que la probabilidad está entre 0 y 1
             assert 0 <= relationship["adjustedProb"] <= 1, \
                 f"Probabilidad inválida: {relationship['adjustedProb']}"
 
-def test_third_cousins_female():
-    """
-    Verifica el caso de primas terceras (3C) con herencia del cromosoma X.
-    """
-    payload = {
-        "cm": 65.8,
-        "generacion": "3",
-        "sexo": "F",
-        "x_inheritance": True,
-        "segments": 5,
-        "largest_segment": 24.5
-    }
-    response = client.post("/api/v1/analyze", json=payload)
-    assert response.status_code == 200
-    data = response.json()
-    assert isinstance(data, dict)
-    assert "relationships" in data
-    assert isinstance(data["relationships"], list)
-    assert len(data["relationships"]) > 0
-    # Verificar que la relación más probable es 3C
-    sorted_results = sorted(data["relationships"], key=lambda x: x["adjustedProb"], reverse=True)
-    most_probable = sorted_results[0]
-    assert most_probable["code"] == "3C"
-    assert most_probable["adjustedProb"] >= 0.15
-
-def test_half_sisters_paternal_xmatch():
-    """
-    Verifica el caso de medias hermanas con herencia paterna del cromosoma X.
-    """
-    payload = {
-        "cm": 1800,
-        "generacion": "0",
-        "sexo": "F",
-        "x_inheritance": True,
-        "segments": 35,
-        "largest_segment": 150.2
-    }
-    response = client.post("/api/v1/analyze", json=payload)
-    assert response.status_code == 200
-    data = response.json()
-    assert isinstance(data, dict)
-    assert "relationships" in data
-    assert isinstance(data["relationships"], list)
-    assert len(data["relationships"]) > 0
-    # Verificar que la relación más probable es HS
-    sorted_results = sorted(data["relationships"], key=lambda x: x["adjustedProb"], reverse=True)
-    most_probable = sorted_results[0]
-    assert most_probable["code"] == "HS"
-    assert most_probable["adjustedProb"] >= 0.15
-
-def test_second_cousins_female():
-    """
-    Verifica el caso de primas segundas (2C) con herencia del cromosoma X.
-    """
-    payload = {
-        "cm": 286.3,
-        "generacion": "2",
-        "sexo": "F",
-        "x_inheritance": True,
-        "segments": 14,
-        "largest_segment": 79.2
-    }
-    response = client.post("/api/v1/analyze", json=payload)
-    assert response.status_code == 200
-    data = response.json()
-    assert isinstance(data, dict)
-    assert "relationships" in data
-    assert isinstance(data["relationships"], list)
-    assert len(data["relationships"]) > 0
-    # Verificar que la relación más probable es 2C
-    sorted_results = sorted(data["relationships"], key=lambda x: x["adjustedProb"], reverse=True)
-    most_probable = sorted_results[0]
-    assert most_probable["code"] == "2C"
-    assert most_probable["adjustedProb"] >= 0.15
-
-def test_first_cousin_of_parent():
+@pytest.mark.parametrize("x_text,x_bool", [
+    ("no", False),
+    ("false", False),
+    ("yes", True),
+    ("true", True),
+    (" Sí ", True),
+    ("", None),
+    ("maybe", None),
+    ("2", None),
+    (2, None),
+])
+async def test_x_inheritance_text_values(aclient, x_text, x_bool):
     """
-    Verifica el caso de primo/a hermano/a de un padre (1C1R).
+    Verifica que x_inheritance en texto (sí/no) se analiza igual que su equivalente booleano
+    y que los valores no reconocidos se aceptan y se tratan como desconocidos (None).
     """
-    payload = {
-        "cm": 884.6,
-        "generacion": "1",
-        "sexo": "M",
-        "x_inheritance": False,
-        "segments": 29,
-        "largest_segment": 100.1
-    }
-    response = client.post("/api/v1/analyze", json=payload)
-    assert response.status_code == 200
-    data = response.json()
-    assert isinstance(data, dict)
-    assert "relationships" in data
-    assert isinstance(data["relationships"], list)
-    assert len(data["relationships"]) > 0
-    # Verificar que la relación más probable es 1C1R o 1C
-    sorted_results = sorted(data["relationships"], key=lambda x: x["adjustedProb"], reverse=True)
-    most_probable = sorted_results[0]
-    assert most_probable["code"] in ["1C1R", "1C"], f"Se esperaba 1C1R o 1C pero se obtuvo {most_probable['code']}"
-    assert most_probable["adjustedProb"] >= 0.15 
\ No newline at end of file
+    payload = {"cm": 2613, "segments": 40, "largest_segment": 150}
+    text_response, bool_response = await asyncio.gather(
+        aclient.post("/api/v1/analyze", json={**payload, "x_inheritance": x_text}),
+        aclient.post("/api/v1/analyze", json={**payload, "x_inheritance": x_bool}),
+    )
+    assert text_response.status_code == 200, f"Estado incorrecto para x_inheritance={x_text!r}"
+    assert rj(text_response) == rj(bool_response)
@@ -0,0 +1,129 @@
+import pytest
+import importlib
+import numpy as np
+from fastapi import FastAPI, Request, Response
+from fastapi.testclient import TestClient
+from slowapi import _rate_limit_exceeded_handler
+from slowapi.errors import RateLimitExceeded
+
+@pytest.fixture(scope="module")
+def app_main(tmp_path_factory):
+    """
+    Módulo app.main (la API con base de datos) importado sin arrancar la app;
+    slowapi lee un .env del directorio actual cada vez que se crea un Limiter
+    """
+    env_dir = tmp_path_factory.mktemp("env")
+    (env_dir / ".env").touch()
+    with pytest.MonkeyPatch.context() as mp:
+        mp.chdir(env_dir)
+        yield importlib.import_module("app.main")
+
+# Límite de la app mínima de prueba, el mismo que app.main aplica a /health
+TEST_LIMIT = 5
+
+def limited_client(limiter):
+    """
+    Cliente de una app mínima con una ruta limitada por el limiter, como /health en app.main
+    """
+    limited_app = FastAPI()
+    limited_app.state.limiter = limiter
+    limited_app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+
+    @limited_app.get("/")
+    @limiter.limit(f"{TEST_LIMIT}/minute")
+    async def read_root(request: Request):
+        return Response(content=b'{"ok":true}', media_type="application/json")
+
+    return TestClient(limited_app)
+
+def assert_limited(client):
+    """
+    Comprueba que solo pasan TEST_LIMIT peticiones y que el 429 incluye los headers de rate limit
+    """
+    responses = [client.get("/") for _ in range(TEST_LIMIT + 1)]
+    codes = [response.status_code for response in responses]
+    assert codes.count(200) == TEST_LIMIT
+    assert codes.count(429) == 1
+    rejected = responses[-1]
+    assert rejected.status_code == 429
+    for header in ("retry-after", "x-ratelimit-limit", "x-ratelimit-remaining"):
+        assert header in rejected.headers, f"El 429 debería incluir el header {header}"
+    assert rejected.headers["x-ratelimit-limit"] == str(TEST_LIMIT)
+
+@pytest.mark.security
+def test_limiter_memory_storage(app_main):
+    """
+    Verifica que sin REDIS_URL el limiter usa memoria del proceso, sin fallback,
+    y aplica el límite de la ruta con sus headers.
+    """
+    limiter = app_main.create_limiter(None)
+    assert type(limiter._storage).__name__ == "MemoryStorage"
+    assert not limiter._in_memory_fallback_enabled
+    assert_limited(limited_client(limiter))
+
+@pytest.mark.security
+def test_limiter_redis_fallback(app_main):
+    """
+    Verifica que con REDIS_URL los contadores van a Redis y que, si Redis no responde,
+    el limiter sigue aplicando el límite desde memoria en lugar de fallar.
+    """
+    pytest.importorskip("redis")
+    # Puerto 1: nunca hay un Redis escuchando
+    limiter = app_main.create_limiter("redis://127.0.0.1:1/0")
+    assert type(limiter._storage).__name__ == "RedisStorage"
+    assert limiter._in_memory_fallback_enabled
+
+    client = limited_client(limiter)
+    assert_limited(client)
+    assert limiter._storage_dead, "Redis inaccesible debería marcar el almacenamiento como caído"
+
+def baseline_probability(curve, cm):
+    """
+    Interpolación por segmentos tal como la hacía el cálculo original, punto a punto
+    """
+    for (a_cm, a_p), (b_cm, b_p) in zip(curve, curve[1:]):
+        if a_cm <= cm <= b_cm:
+            return a_p + ((cm - a_cm) / (b_cm - a_cm)) * (b_p - a_p)
+    return 0
+
+def pack_curves(app_main, curves):
+    """
+    PackedRelationships con una fila por curva, con rangos de cM que cubren cualquier valor
+    """
+    width = max([len(curve) for curve in curves] + [1])
+    curve_cm = np.full((len(curves), width), np.inf)
+    curve_p = np.zeros((len(curves), width))
+    for i, curve in enumerate(curves):
+        curve_cm[i, :len(curve)] = [point[0] for point in curve]
+        curve_p[i, :len(curve)] = [point[1] for point in curve]
+    return app_main.PackedRelationships(
+        codes=[f"R{i}" for i in range(len(curves))],
+        curve_cm=curve_cm,
+        curve_p=curve_p,
+        curve_len=np.array([len(curve) for curve in curves], dtype=np.intp),
+        min_cm=np.zeros(len(curves)),
+        max_cm=np.full(len(curves), 5000.0),
+        generacion=np.ones(len(curves)),
+        x_first_can_share=np.ones(len(curves), dtype=bool),
+    )
+
+PROBABILITY_CURVES = (
+    (),
+    ((500.0, 0.7),),
+    ((100.0, 0.1), (300.0, 0.5), (600.0, 0.2)),
+)
+
+@pytest.mark.analysis
+@pytest.mark.parametrize("cm", [50.0, 100.0, 200.0, 300.0, 450.0, 500.0, 600.0, 700.0])
+def test_compute_probabilities_matches_segment_interpolation(app_main, cm):
+    """
+    Verifica que compute_probabilities coincide con la interpolación por segmentos original:
+    - Fuera de la curva, incluida la curva vacía, la probabilidad es 0
+    - Una curva de un solo punto da 0 aunque cm coincida con ese punto
+    - En los extremos y en los puntos intermedios se devuelve el valor del punto
+    """
+    packed = pack_curves(app_main, PROBABILITY_CURVES)
+    matches, probs = app_main.compute_probabilities(packed, cm, None, None)
+    assert matches.tolist() == list(range(len(PROBABILITY_CURVES)))
+    expected = [baseline_probability(curve, cm) for curve in PROBABILITY_CURVES]
+    assert probs.tolist() == expected, f"Probabilidades distintas para cm={cm}"